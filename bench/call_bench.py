@@ -0,0 +1,97 @@
+"""
+Function call rate benchmark.
+
+Runs a few call-heavy programs on each engine and reports Lox function calls
+per second, keeping the best of several runs. The time includes the loop or
+arithmetic driving the calls, which every program keeps small. Results go
+through LoxRuntime with memoization off, so every call really runs.
+
+    python bench/call_bench.py [--calls N] [--repeat R] [--engine E ...]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lox_runtime import LoxRuntime
+
+
+def fib_calls(n: int) -> int:
+    a, b = 1, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return 2 * a - 1
+
+
+def fib_depth(calls: int) -> int:
+    # The largest fib argument making no more than calls calls.
+    depth = 1
+    while fib_calls(depth + 1) <= calls:
+        depth += 1
+    return depth
+
+
+# Name, program calling its functions about {n} times, and the exact number of calls it makes for n.
+PROGRAMS = [
+    ("no arguments", """
+        fun one() { return 1; }
+        for (var i = 0; i < {n}; i = i + 1) one();
+    """, lambda n: n),
+    ("arguments", """
+        fun add(a, b, c) { return a + b + c; }
+        for (var i = 0; i < {n}; i = i + 1) add(i, 1, 2);
+    """, lambda n: n),
+    ("locals", """
+        fun mix(a, b) { var c = a * b; { var d = c - a; return d + b; } }
+        for (var i = 0; i < {n}; i = i + 1) mix(i, 2);
+    """, lambda n: n),
+    ("recursion", """
+        fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+        fib({depth});
+    """, lambda n: fib_calls(fib_depth(n))),
+    ("tail calls", """
+        fun count(n) { if (n < 1) return 0; return count(n - 1); }
+        count({n});
+    """, lambda n: n + 1),
+]
+
+
+def measure(engine: str, source: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        runtime = LoxRuntime(engine, memoize=False)
+        statements = runtime.prepare(source)
+        if statements is None:
+            raise SystemExit("benchmark program failed to parse")
+
+        start = time.perf_counter()
+        runtime.run_statements(statements)
+        best = min(best, time.perf_counter() - start)
+
+        if runtime.errors.had_runtime_error:
+            raise SystemExit("benchmark program failed at runtime: " + "; ".join(runtime.errors.messages))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100000, help="calls per program, about")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engine", action="append", choices=LoxRuntime.ENGINES,
+        help="engine to run, repeatable; all of them by default")
+    args = parser.parse_args()
+
+    n = args.calls
+    print(f"{'engine':8} {'program':14} {'calls':>9} {'seconds':>9} {'calls/s':>12}")
+
+    for engine in args.engine or LoxRuntime.ENGINES:
+        for name, template, calls in PROGRAMS:
+            source = template.replace("{n}", str(n)).replace("{depth}", str(fib_depth(n)))
+            seconds = measure(engine, source, args.repeat)
+            print(f"{engine:8} {name:14} {calls(n):9d} {seconds:9.4f} {calls(n) / seconds:12.0f}")
+
+
+if __name__ == "__main__":
+    main()
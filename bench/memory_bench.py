@@ -0,0 +1,134 @@
+"""
+Memory footprint of tokens and syntax trees.
+
+Scans and parses a synthetic program (or the files given on the command
+line) under tracemalloc and reports the bytes allocated per token and per
+AST node. The same source is also measured with copies of Token and the
+node classes that have no __slots__, and with lexemes left uninterned, so
+the saving of each is measured rather than remembered.
+
+    python bench/memory_bench.py [--lines N] [file.lox ...]
+"""
+import argparse
+import dataclasses
+import os
+import sys
+import tracemalloc
+import types
+from contextlib import ExitStack
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import expr
+import parser as lox_parser
+import scanner
+import stmt
+from scanner import FastScanner
+from parser import Parser
+from expr import Expr
+from stmt import Stmt
+from lox_token import Token
+from scanner_bench import synthetic_source
+
+
+def attributes(node):
+    if hasattr(node, "__dict__"):
+        return list(vars(node).values())
+
+    names = []
+    for cls in type(node).__mro__:
+        names.extend(getattr(cls, "__slots__", ()))
+    return [getattr(node, name) for name in names if hasattr(node, name)]
+
+
+def count_nodes(statements) -> int:
+    count = 0
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(node)
+        elif isinstance(node, (Expr, Stmt)):
+            count += 1
+            pending.extend(attributes(node))
+    return count
+
+
+def unslotted_nodes(module) -> dict:
+    """Copies of the node classes in module, by name, whose instances keep their fields in a __dict__."""
+    classes = {}
+    for name, cls in vars(module).items():
+        if isinstance(cls, type) and cls.__module__ == module.__name__ and cls.__bases__ in ((Expr,), (Stmt,)):
+            namespace = {key: value for key, value in vars(cls).items()
+                         if key not in ("__slots__", "__dict__", "__weakref__")
+                         and not isinstance(value, types.MemberDescriptorType)}
+            classes[name] = type(name, cls.__bases__, namespace)
+    return classes
+
+
+def unslotted_token():
+    fields = [(field.name, field.type) for field in dataclasses.fields(Token)]
+    return dataclasses.make_dataclass("Token", fields, namespace={"__str__": Token.__str__})
+
+
+def measure(source: str, slots: bool, interned: bool):
+    """Scans and parses source, returning the tokens, their bytes, the AST nodes and their bytes."""
+    with ExitStack() as stack:
+        if not slots:
+            stack.enter_context(mock.patch.object(scanner, "Token", unslotted_token()))
+            # The parser builds nodes through the names it imported from expr and stmt.
+            for module in (expr, stmt):
+                stack.enter_context(mock.patch.dict(vars(lox_parser), unslotted_nodes(module)))
+        if not interned:
+            stack.enter_context(mock.patch.object(sys, "intern", lambda text: text))
+
+        tracemalloc.start()
+
+        before = tracemalloc.get_traced_memory()[0]
+        tokens = FastScanner(source).scan_tokens()
+        token_bytes = tracemalloc.get_traced_memory()[0] - before
+
+        before = tracemalloc.get_traced_memory()[0]
+        statements = Parser(tokens).parse()
+        tree_bytes = tracemalloc.get_traced_memory()[0] - before
+
+        tracemalloc.stop()
+
+    return len(tokens), token_bytes, count_nodes(statements), tree_bytes
+
+
+VARIANTS = (
+    ("slots, interned", True, True),
+    ("slots", True, False),
+    ("interned", False, True),
+    ("neither", False, False),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--lines", type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.files:
+        source = "".join(open(path).read() for path in args.files)
+    else:
+        source = synthetic_source(args.lines)
+
+    print(f"source: {len(source)} chars")
+    print(f"{'variant':16} {'tokens':>9} {'bytes/token':>12} {'nodes':>9} {'bytes/node':>11}")
+
+    results = {}
+    for name, slots, interned in VARIANTS:
+        tokens, token_bytes, nodes, tree_bytes = measure(source, slots, interned)
+        results[name] = (token_bytes / tokens, tree_bytes / nodes)
+        print(f"{name:16} {tokens:9d} {token_bytes / tokens:12.1f} {nodes:9d} {tree_bytes / nodes:11.1f}")
+
+    (token, node), (plain_token, plain_node) = results[VARIANTS[0][0]], results[VARIANTS[-1][0]]
+    print(f"saved against neither: {1 - token / plain_token:.1%} per token, {1 - node / plain_node:.1%} per node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Per phase benchmark over the programs in bench/corpus.
+
+Times scanning, parsing and interpreting (resolution included) each program
+separately, keeping the best of several runs, plus scanning and parsing a
+synthetic multi-MB source. Results are printed, optionally written as JSON,
+and compared against a stored baseline; any phase slower than the baseline by
+more than the threshold is flagged and the exit status is 1. A baseline
+recorded with another --repeat or --synthetic-lines is refused.
+
+    python bench/phase_bench.py [--repeat R] [--engine E] [--output results.json]
+    python bench/phase_bench.py --save-baseline    # record bench/baseline.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH, ".."))
+
+from scanner import Scanner, FastScanner
+from parser import Parser
+from resolver import Resolver
+from lox_runtime import LoxRuntime
+from errors import Error
+from scanner_bench import synthetic_source
+
+PHASES = ("scan", "parse", "interpret")
+# A baseline only compares with runs measured the same way.
+SETTINGS = ("repeat", "synthetic_lines")
+
+
+def run_once(source: str, scanner_class, engine: str | None):
+    Error.reset()
+    times = {}
+
+    start = time.perf_counter()
+    tokens = scanner_class(source).scan_tokens()
+    times["scan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    statements = Parser(tokens).parse()
+    times["parse"] = time.perf_counter() - start
+
+    if Error.had_error:
+        raise SystemExit("benchmark program failed to parse")
+
+    if engine is not None:
+        # Fresh globals for every run, so programs do not see each other's definitions. Memoization would
+        # answer most calls of the later runs from the cache, and the optimizer is not a phase measured here.
+        runtime = LoxRuntime(engine, optimize=False, memoize=False)
+        start = time.perf_counter()
+        Resolver(runtime.errors).resolve(statements)
+        runtime.run_statements(statements)
+        runtime.output.flush()
+        times["interpret"] = time.perf_counter() - start
+
+        if runtime.errors.had_error or runtime.errors.had_runtime_error:
+            raise SystemExit("benchmark program failed at runtime")
+
+    return times
+
+
+def measure(source: str, scanner_class, engine: str | None, repeat: int):
+    best = {}
+    for _ in range(repeat):
+        for phase, elapsed in run_once(source, scanner_class, engine).items():
+            best[phase] = min(best.get(phase, float("inf")), elapsed)
+    return best
+
+
+def compare(results, baseline, threshold: float, noise: float) -> bool:
+    regressed = False
+    print(f"{'program':12} {'phase':10} {'seconds':>10} {'baseline':>10} {'change':>8}")
+
+    for name, phases in results["programs"].items():
+        for phase in PHASES:
+            if phase not in phases:
+                continue
+
+            elapsed = phases[phase]
+            previous = (baseline or {}).get("programs", {}).get(name, {}).get(phase)
+            if previous is None:
+                print(f"{name:12} {phase:10} {elapsed:10.4f}")
+                continue
+
+            change = elapsed / previous - 1
+            flag = ""
+            # Phases taking a fraction of a millisecond vary by more than the threshold from run to run.
+            if change > threshold and elapsed - previous > noise:
+                flag = "  REGRESSION"
+                regressed = True
+            print(f"{name:12} {phase:10} {elapsed:10.4f} {previous:10.4f} {change:+7.1%}{flag}")
+
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engine", choices=LoxRuntime.ENGINES, default="tree")
+    parser.add_argument("--scanner", choices=["fast", "simple"], default="fast")
+    parser.add_argument("--synthetic-lines", type=int, default=50000,
+        help="lines of generated source for the scan and parse only program")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=os.path.join(BENCH, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true",
+        help="store the results as the new baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.15,
+        help="relative slowdown reported as a regression")
+    parser.add_argument("--noise", type=float, default=0.002,
+        help="slowdowns of fewer seconds than this are never reported")
+    args = parser.parse_args()
+
+    scanner_class = FastScanner if args.scanner == "fast" else Scanner
+    results = {
+        "python": platform.python_version(),
+        "engine": args.engine,
+        "scanner": args.scanner,
+        "repeat": args.repeat,
+        "synthetic_lines": args.synthetic_lines,
+        "programs": {},
+    }
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # Checked before measuring, which takes a while.
+        for key in SETTINGS:
+            if baseline.get(key) != results[key]:
+                parser.error(f"baseline was recorded with {key} {baseline.get(key)}, this run uses {results[key]}; "
+                             f"pass --{key.replace('_', '-')} {baseline.get(key)} or --save-baseline")
+        for key in ("python", "engine", "scanner"):
+            if baseline.get(key) != results[key]:
+                print(f"note: baseline was recorded with {key} {baseline.get(key)}, this run uses {results[key]}")
+
+    for path in sorted(glob.glob(os.path.join(BENCH, "corpus", "*.lox"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path) as f:
+            results["programs"][name] = measure(f.read(), scanner_class, args.engine, args.repeat)
+
+    source = synthetic_source(args.synthetic_lines)
+    results["programs"]["synthetic"] = measure(source, scanner_class, None, args.repeat)
+    results["programs"]["synthetic"]["bytes"] = len(source)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        compare(results, None, args.threshold, args.noise)
+        return
+
+    if compare(results, baseline, args.threshold, args.noise):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Scanner throughput benchmark.
+
+Scans a synthetic program (or the files given on the command line) with
+Scanner and FastScanner, checks that both produce the same tokens and
+reports tokens per second for each.
+
+    python bench/scanner_bench.py [--lines N] [--repeat R] [file.lox ...]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scanner import Scanner, FastScanner
+
+
+def synthetic_source(lines: int) -> str:
+    template = [
+        'var value_{i} = {i} * 2.5 + (3 - 1) / 4;',
+        'fun helper_{i}(a, b) {{ if (a <= b and !(a == b)) print "a is less"; else print a >= b; }}',
+        '// comment line {i} with some text',
+        'while (value_{i} > 0) {{ value_{i} = value_{i} - 1; }}',
+        '/* block comment {i} */ print "string number {i}" + value_{i};',
+    ]
+    return "\n".join(template[i % len(template)].format(i=i) for i in range(lines)) + "\n"
+
+
+def measure(scanner_class, source: str, repeat: int):
+    best = float("inf")
+    tokens = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = scanner_class(source).scan_tokens()
+        best = min(best, time.perf_counter() - start)
+    return tokens, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        source = "".join(open(path).read() for path in args.files)
+    else:
+        source = synthetic_source(args.lines)
+
+    print(f"source: {len(source)} chars")
+
+    results = {}
+    for scanner_class in (Scanner, FastScanner):
+        tokens, seconds = measure(scanner_class, source, args.repeat)
+        results[scanner_class.__name__] = tokens
+        print(f"{scanner_class.__name__:12} {len(tokens):9d} tokens {seconds:8.3f}s {len(tokens) / seconds:12.0f} tokens/s")
+
+    expected = [(t.type, t.lexeme, t.literal, t.line) for t in results["Scanner"]]
+    actual = [(t.type, t.lexeme, t.literal, t.line) for t in results["FastScanner"]]
+    if expected != actual:
+        print("token streams differ")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+from expr import *
+from stmt import *
+from environment import Environment
+from lox_token import Token, TokenType
+from lox_callable import LoxCallable, RETURN
+from errors import LoxRuntimeError
+from typing import Callable, List
+
+
+class FunctionCode:
+    """Body of a function declaration, turned into closures on its first call."""
+    def __init__(self, compiler, declaration: Function):
+        self.compiler = compiler
+        self.declaration = declaration
+        self.body = None
+        # The slots of a frame past the parameters, which the arguments are extended with to make its values.
+        self.arity = len(declaration.parameters)
+        self.locals = [None] * (declaration.size - self.arity)
+
+    def compile(self):
+        self.body = self.compiler.compile_statements(self.declaration.body)
+        return self.body
+
+
+class CompiledFunction(LoxCallable):
+    def __init__(self, code: FunctionCode):
+        self.code = code
+
+    def call(self, interpreter, arguments: List):
+        function = self
+        compiler = self.code.compiler
+        # See Interpreter.free_environments.
+        free = interpreter.free_environments
+
+        # Calls in tail position are left to this loop, so tail recursion runs in constant Python stack.
+        while True:
+            code = function.code
+            environment = free.pop() if free else Environment()
+            environment.values = arguments + code.locals
+            status = (code.body or code.compile())(environment)
+            environment.values = None
+            free.append(environment)
+
+            if status is not RETURN:
+                return None
+
+            if compiler.tail_call is None:
+                return compiler.returned
+
+            function, arguments = compiler.tail_call
+            compiler.tail_call = None
+
+    def arity(self): return self.code.arity
+
+    def __str__(self): return f"<fun {self.code.declaration.name.lexeme}>"
+
+
+class ClosureCompiler(StmtVisitor, ExprVisitor):
+    """
+    Turns resolved statement and expression trees into nested Python closures.
+
+    Every closure takes the current environment and returns the node's value,
+    so execution never goes back through accept() or the operator match.
+    Top level code is compiled up front, function bodies on their first call.
+
+    Statement closures return RETURN when a return statement ends their
+    function; only statements that contain one pay for checking it.
+    """
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.globals = interpreter.globals
+        # Set by a return statement for CompiledFunction.call to pick up.
+        self.returned = None
+        self.tail_call = None
+
+    def interpret(self, statements: List[Stmt]):
+        try:
+            self.compile_statements(statements)(self.globals)
+        except LoxRuntimeError as e:
+            self.interpreter.errors.runtime_error(e)
+
+    def compile_statements(self, statements: List[Stmt]) -> Callable:
+        compiled = tuple(self.compile_stmt(statement) for statement in statements)
+
+        if len(compiled) == 1:
+            return compiled[0]
+
+        if any(self.returns(statement) for statement in statements):
+            def run_returning(env):
+                for statement in compiled:
+                    if statement(env) is RETURN:
+                        return RETURN
+            return run_returning
+
+        def run(env):
+            for statement in compiled:
+                statement(env)
+        return run
+
+    def compile_stmt(self, stmt: Stmt) -> Callable:
+        return stmt.accept(self)
+
+    def compile_expr(self, expr: Expr) -> Callable:
+        return expr.accept(self)
+
+    def visit_expression_stmt(self, stmt: Expression):
+        return self.compile_expr(stmt.expression)
+
+    def visit_function_stmt(self, stmt: Function):
+        code = FunctionCode(self, stmt)
+        return self.definition(stmt.name, stmt.slot, lambda env: CompiledFunction(code))
+
+    def visit_if_stmt(self, stmt: If):
+        condition = self.compile_expr(stmt.condition)
+        then_branch = self.compile_stmt(stmt.then_branch)
+
+        if stmt.else_branch is None:
+            def if_(env):
+                if condition(env): return then_branch(env)
+            return if_
+
+        else_branch = self.compile_stmt(stmt.else_branch)
+
+        def if_else(env):
+            if condition(env): return then_branch(env)
+            else: return else_branch(env)
+        return if_else
+
+    def visit_print_stmt(self, stmt: Print):
+        expression = self.compile_expr(stmt.expression)
+        stringify, write = self.interpreter.stringify, self.interpreter.output.write
+
+        def print_(env):
+            write(stringify(expression(env)) + "\n")
+        return print_
+
+    def visit_block_stmt(self, stmt: Block):
+        if stmt.size is None:
+            # Its variables live in the current environment, see Resolver.
+            return self.compile_statements(stmt.statements)
+
+        statements = tuple(self.compile_stmt(statement) for statement in stmt.statements)
+        size = stmt.size
+
+        if self.returns(stmt):
+            def block_returning(env):
+                inner = Environment(size)
+                for statement in statements:
+                    if statement(inner) is RETURN:
+                        return RETURN
+            return block_returning
+
+        def block(env):
+            inner = Environment(size)
+            for statement in statements:
+                statement(inner)
+        return block
+
+    def visit_declaration_stmt(self, stmt: Var):
+        if stmt.initializer is None:
+            initializer = lambda env: None
+        else:
+            initializer = self.compile_expr(stmt.initializer)
+
+        return self.definition(stmt.name, stmt.slot, initializer)
+
+    def visit_while_stmt(self, stmt: While):
+        condition = self.compile_expr(stmt.condition)
+        body = self.compile_stmt(stmt.body)
+
+        if self.returns(stmt.body):
+            def while_returning(env):
+                while condition(env):
+                    if body(env) is RETURN:
+                        return RETURN
+            return while_returning
+
+        def while_(env):
+            while condition(env):
+                body(env)
+        return while_
+
+    def visit_return_stmt(self, stmt: Return):
+        compiler = self
+
+        if isinstance(stmt.value, Call):
+            target = self.call_target(stmt.value)
+            interpreter, paren = self.interpreter, stmt.value.paren
+
+            def return_call(env):
+                function, values = target(env)
+                if type(function) is CompiledFunction:
+                    compiler.tail_call = (function, values)
+                else:
+                    compiler.returned = interpreter.call_native(function, values, paren)
+                return RETURN
+            return return_call
+
+        if stmt.value is None:
+            def return_nil(env):
+                compiler.returned = None
+                return RETURN
+            return return_nil
+
+        value = self.compile_expr(stmt.value)
+
+        def return_(env):
+            compiler.returned = value(env)
+            return RETURN
+        return return_
+
+    def visit_conditional_expr(self, expr: Conditional):
+        condition = self.compile_expr(expr.condition)
+        then_branch = self.compile_expr(expr.then_branch)
+        else_branch = self.compile_expr(expr.else_branch)
+        return lambda env: then_branch(env) if condition(env) else else_branch(env)
+
+    def visit_binary_expr(self, expr: Binary):
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        operator = expr.operator
+        # Operands statically known to be numbers need no runtime type checks.
+        numeric = self.is_number(expr.left) and self.is_number(expr.right)
+
+        match(operator.type):
+            case TokenType.PLUS:
+                if numeric:
+                    return lambda env: left(env) + right(env)
+
+                def plus(env):
+                    l, r = left(env), right(env)
+                    if (isinstance(l, float) and isinstance(r, float)) \
+                        or (isinstance(l, str) and isinstance(r, str)):
+                        return l + r
+                    elif isinstance(l, str) or isinstance(r, str):
+                        return str(l) + str(r)
+                    raise LoxRuntimeError(operator,
+                        f"Not supported between operands of type {type(l)} and {type(r)}.")
+                return plus
+
+            case TokenType.MINUS:
+                if numeric:
+                    return lambda env: left(env) - right(env)
+                return self.number_operation(operator, left, right, float.__sub__)
+
+            case TokenType.STAR:
+                if numeric:
+                    return lambda env: left(env) * right(env)
+                return self.number_operation(operator, left, right, float.__mul__)
+
+            case TokenType.SLASH:
+                def divide(env):
+                    l, r = left(env), right(env)
+                    if not (isinstance(l, float) and isinstance(r, float)):
+                        raise LoxRuntimeError(operator, "Operands must be numbers")
+                    if r == 0:
+                        raise LoxRuntimeError(operator, "Division by Zero")
+                    return l / r
+                return divide
+
+            case TokenType.COMMA:
+                return lambda env: (left(env), right(env))[1]
+
+            case TokenType.EQUAL_EQUAL:
+                return lambda env: left(env) == right(env)
+
+            case TokenType.BANG_EQUAL:
+                return lambda env: left(env) != right(env)
+
+            case TokenType.LESS:
+                if numeric:
+                    return lambda env: left(env) < right(env)
+                return self.number_operation(operator, left, right, float.__lt__)
+
+            case TokenType.LESS_EQUAL:
+                if numeric:
+                    return lambda env: left(env) <= right(env)
+                return self.number_operation(operator, left, right, float.__le__)
+
+            case TokenType.GREATER:
+                if numeric:
+                    return lambda env: left(env) > right(env)
+                return self.number_operation(operator, left, right, float.__gt__)
+
+            case TokenType.GREATER_EQUAL:
+                if numeric:
+                    return lambda env: left(env) >= right(env)
+                return self.number_operation(operator, left, right, float.__ge__)
+
+            case _:
+               raise NotImplementedError(f"Operator type <{operator.type}> not implemented.")
+
+    def visit_call_expr(self, expr: Call):
+        callee = self.compile_expr(expr.callee)
+        arguments = tuple(self.compile_expr(argument) for argument in expr.arguments)
+        paren = expr.paren
+        interpreter = self.interpreter
+
+        def call(env):
+            function = callee(env)
+
+            if not isinstance(function, LoxCallable):
+                raise LoxRuntimeError(paren, "Can only call functions and classes")
+
+            values = [argument(env) for argument in arguments]
+
+            if len(values) != function.arity():
+                raise LoxRuntimeError(paren, f"Expected {function.arity()} args but got {len(values)}.")
+
+            try:
+                return function.call(interpreter, values)
+            except LoxRuntimeError as error:
+                if error.token is None:
+                    error.token = paren
+                raise
+        return call
+
+    def call_target(self, expr: Call) -> Callable:
+        # The checks of visit_call_expr, returning the function and arguments instead of calling.
+        callee = self.compile_expr(expr.callee)
+        arguments = tuple(self.compile_expr(argument) for argument in expr.arguments)
+        paren = expr.paren
+
+        def target(env):
+            function = callee(env)
+
+            if not isinstance(function, LoxCallable):
+                raise LoxRuntimeError(paren, "Can only call functions and classes")
+
+            values = [argument(env) for argument in arguments]
+
+            if len(values) != function.arity():
+                raise LoxRuntimeError(paren, f"Expected {function.arity()} args but got {len(values)}.")
+
+            return function, values
+        return target
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return self.compile_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        value = expr.value
+        return lambda env: value
+
+    def visit_logical_expr(self, expr: Logical):
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+
+        if expr.operator.type == TokenType.OR:
+            return lambda env: True if left(env) else right(env)
+        return lambda env: right(env) if left(env) else False
+
+    def visit_unary_expr(self, expr: Unary):
+        right = self.compile_expr(expr.right)
+        operator = expr.operator
+
+        match(operator.type):
+            case TokenType.BANG:
+                return lambda env: not right(env)
+
+            case TokenType.MINUS:
+                if self.is_number(expr.right):
+                    return lambda env: -right(env)
+
+                def negate(env):
+                    value = right(env)
+                    if not isinstance(value, float):
+                        raise LoxRuntimeError(operator, "Operand must be a number")
+                    return -value
+                return negate
+
+            case _:
+                raise NotImplementedError(f"Operator <{operator.type}> not implemented.")
+
+    def visit_variable_expr(self, expr: Variable):
+        slot = expr.slot
+
+        match(expr.depth):
+            case None:
+                globals_, get, name = self.globals, self.globals.get, expr.name
+
+                def get_global(env):
+                    if expr.version == globals_.version:
+                        return expr.cached
+
+                    expr.cached = value = get(name)
+                    expr.version = globals_.version
+                    return value
+                return get_global
+            case _:
+                return lambda env: env.values[slot]
+
+    def visit_assign_expr(self, expr: Assign):
+        value = self.compile_expr(expr.value)
+        slot = expr.slot
+
+        match(expr.depth):
+            case None:
+                assign, name = self.globals.assign, expr.name
+                return lambda env: assign(name, value(env))
+            case _:
+                def assign_slot(env):
+                    result = env.values[slot] = value(env)
+                    return result
+                return assign_slot
+
+    def definition(self, name: Token, slot: int, value: Callable) -> Callable:
+        if slot is None:
+            define = self.globals.define
+            return lambda env: define(name, value(env))
+
+        def define_local(env):
+            env.values[slot] = value(env)
+        return define_local
+
+    def number_operation(self, operator: Token, left: Callable, right: Callable, operation: Callable):
+        def checked(env):
+            l, r = left(env), right(env)
+            if not (isinstance(l, float) and isinstance(r, float)):
+                raise LoxRuntimeError(operator, "Operands must be numbers")
+            return operation(l, r)
+        return checked
+
+    def returns(self, stmt: Stmt) -> bool:
+        if isinstance(stmt, Return):
+            return True
+        if isinstance(stmt, Block):
+            return any(self.returns(statement) for statement in stmt.statements)
+        if isinstance(stmt, If):
+            return self.returns(stmt.then_branch) \
+                or (stmt.else_branch is not None and self.returns(stmt.else_branch))
+        if isinstance(stmt, While):
+            return self.returns(stmt.body)
+        return False
+
+    def is_number(self, expr: Expr) -> bool:
+        if isinstance(expr, Literal):
+            return isinstance(expr.value, float)
+        if isinstance(expr, Grouping):
+            return self.is_number(expr.expression)
+        if isinstance(expr, Unary):
+            return expr.operator.type == TokenType.MINUS
+        if isinstance(expr, Binary):
+            if expr.operator.type in (TokenType.MINUS, TokenType.STAR, TokenType.SLASH):
+                return True
+            if expr.operator.type == TokenType.PLUS:
+                return self.is_number(expr.left) and self.is_number(expr.right)
+        return False
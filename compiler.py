@@ -0,0 +1,347 @@
+from expr import *
+from stmt import *
+from lox_token import Token, TokenType
+from typing import Dict, List
+import math
+
+
+class OpCode:
+    CONSTANT = 0
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    POP = 4
+    GET_LOCAL = 5
+    SET_LOCAL = 6
+    STORE_LOCAL = 7
+    GET_GLOBAL = 8
+    SET_GLOBAL = 9
+    DEFINE_GLOBAL = 10
+    ADD = 11
+    SUBTRACT = 12
+    MULTIPLY = 13
+    DIVIDE = 14
+    EQUAL = 15
+    NOT_EQUAL = 16
+    LESS = 17
+    LESS_EQUAL = 18
+    GREATER = 19
+    GREATER_EQUAL = 20
+    NOT = 21
+    NEGATE = 22
+    PRINT = 23
+    JUMP = 24
+    POP_JUMP_IF_FALSE = 25
+    CALL = 26
+    FUNCTION = 27
+    RETURN = 28
+    STORE_GLOBAL = 29
+    JUMP_IF_NOT_LESS = 30
+    JUMP_IF_NOT_LESS_EQUAL = 31
+    JUMP_IF_NOT_GREATER = 32
+    JUMP_IF_NOT_GREATER_EQUAL = 33
+    TAIL_CALL = 34
+
+
+class Chunk:
+    """
+    Compiled code for a script or a function body.
+
+    `code` holds opcodes with their operands inlined, `constants` the literal
+    pool they index into, and `tokens` records for every position in `code`
+    the token to blame when the instruction raises a runtime error.
+    """
+    def __init__(self):
+        self.code: List[int] = []
+        self.constants: List[object] = []
+        self.tokens: List[Token] = []
+        self.__constant_index: Dict[tuple, int] = dict()
+
+    def emit(self, token: Token, *code: int) -> int:
+        self.code.extend(code)
+        self.tokens.extend([token] * len(code))
+        return len(self.code) - 1
+
+    def add_constant(self, value) -> int:
+        key = (type(value), value)
+        if type(value) is float:
+            # 0.0 == -0.0, but 1 / x tells them apart.
+            key += (math.copysign(1.0, value),)
+        if key not in self.__constant_index:
+            self.__constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return self.__constant_index[key]
+
+
+class FunctionProto:
+    def __init__(self, name: str, arity: int):
+        self.name = name
+        self.arity = arity
+        self.chunk = Chunk()
+        self.locals = 0
+
+
+class Compiler(StmtVisitor, ExprVisitor):
+    """Lowers the statement and expression trees into a Chunk for the VM."""
+    BINARY = {
+        TokenType.PLUS: OpCode.ADD,
+        TokenType.MINUS: OpCode.SUBTRACT,
+        TokenType.STAR: OpCode.MULTIPLY,
+        TokenType.SLASH: OpCode.DIVIDE,
+        TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+        TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+        TokenType.LESS: OpCode.LESS,
+        TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+        TokenType.GREATER: OpCode.GREATER,
+        TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    }
+
+    COMPARE_JUMP = {
+        TokenType.LESS: OpCode.JUMP_IF_NOT_LESS,
+        TokenType.LESS_EQUAL: OpCode.JUMP_IF_NOT_LESS_EQUAL,
+        TokenType.GREATER: OpCode.JUMP_IF_NOT_GREATER,
+        TokenType.GREATER_EQUAL: OpCode.JUMP_IF_NOT_GREATER_EQUAL,
+    }
+
+    def __init__(self):
+        self.function: FunctionProto = None
+        self.scopes: List[Dict[str, int]] = []
+        self.token: Token = None
+
+    def compile(self, statements: List[Stmt]) -> FunctionProto:
+        self.function = FunctionProto("script", 0)
+
+        for statement in statements:
+            self.compile_stmt(statement)
+
+        self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+        return self.function
+
+    def compile_stmt(self, stmt: Stmt):
+        stmt.accept(self)
+
+    def visit_expression_stmt(self, stmt: Expression):
+        if isinstance(stmt.expression, Assign):
+            self.assign(stmt.expression, store=True)
+            return
+
+        stmt.expression.accept(self)
+        self.emit(OpCode.POP)
+
+    def visit_function_stmt(self, stmt: Function):
+        enclosing, enclosing_scopes = self.function, self.scopes
+        self.function = FunctionProto(stmt.name.lexeme, len(stmt.parameters))
+        self.scopes = [dict()]
+
+        for parameter in stmt.parameters:
+            self.scopes[-1][parameter.lexeme] = self.new_local()
+
+        for statement in stmt.body:
+            self.compile_stmt(statement)
+
+        self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+
+        function = self.function
+        self.function, self.scopes = enclosing, enclosing_scopes
+
+        self.emit(OpCode.FUNCTION, self.constant(function))
+        self.define(stmt.name)
+
+    def visit_if_stmt(self, stmt: If):
+        else_jump = self.condition(stmt.condition)
+        self.compile_stmt(stmt.then_branch)
+
+        if stmt.else_branch is None:
+            self.patch_jump(else_jump)
+            return
+
+        end_jump = self.emit_jump(OpCode.JUMP)
+        self.patch_jump(else_jump)
+        self.compile_stmt(stmt.else_branch)
+        self.patch_jump(end_jump)
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression.accept(self)
+        self.emit(OpCode.PRINT)
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes.append(dict())
+        for statement in stmt.statements:
+            self.compile_stmt(statement)
+        self.scopes.pop()
+
+    def visit_declaration_stmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        else:
+            self.emit(OpCode.NIL)
+
+        self.define(stmt.name)
+
+    def visit_while_stmt(self, stmt: While):
+        loop_start = len(self.function.chunk.code)
+        exit_jump = self.condition(stmt.condition)
+        self.compile_stmt(stmt.body)
+        self.emit(OpCode.JUMP, loop_start)
+        self.patch_jump(exit_jump)
+
+    def visit_return_stmt(self, stmt: Return):
+        # A call in tail position replaces the current frame instead of pushing one.
+        if isinstance(stmt.value, Call):
+            self.call(stmt.value, OpCode.TAIL_CALL)
+            return
+
+        self.token = stmt.keyword
+        if stmt.value is None:
+            self.emit(OpCode.NIL)
+        else:
+            stmt.value.accept(self)
+
+        self.token = stmt.keyword
+        self.emit(OpCode.RETURN)
+
+    def visit_conditional_expr(self, expr: Conditional):
+        expr.condition.accept(self)
+        else_jump = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        expr.then_branch.accept(self)
+        end_jump = self.emit_jump(OpCode.JUMP)
+        self.patch_jump(else_jump)
+        expr.else_branch.accept(self)
+        self.patch_jump(end_jump)
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left.accept(self)
+
+        if expr.operator.type == TokenType.COMMA:
+            self.emit(OpCode.POP)
+            expr.right.accept(self)
+            return
+
+        expr.right.accept(self)
+
+        self.token = expr.operator
+        self.emit(self.BINARY[expr.operator.type])
+
+    def visit_call_expr(self, expr: Call):
+        self.call(expr, OpCode.CALL)
+
+    def call(self, expr: Call, op: int):
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+        self.token = expr.paren
+        self.emit(op, len(expr.arguments))
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        if expr.value is None: self.emit(OpCode.NIL)
+        elif expr.value is True: self.emit(OpCode.TRUE)
+        elif expr.value is False: self.emit(OpCode.FALSE)
+        else: self.emit(OpCode.CONSTANT, self.constant(expr.value))
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left.accept(self)
+        short_circuit = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+
+        if expr.operator.type == TokenType.OR:
+            self.emit(OpCode.TRUE)
+            end_jump = self.emit_jump(OpCode.JUMP)
+            self.patch_jump(short_circuit)
+            expr.right.accept(self)
+        else:
+            expr.right.accept(self)
+            end_jump = self.emit_jump(OpCode.JUMP)
+            self.patch_jump(short_circuit)
+            self.emit(OpCode.FALSE)
+
+        self.patch_jump(end_jump)
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right.accept(self)
+
+        self.token = expr.operator
+        match(expr.operator.type):
+            case TokenType.BANG: self.emit(OpCode.NOT)
+            case TokenType.MINUS: self.emit(OpCode.NEGATE)
+            case _:
+                raise NotImplementedError(f"Operator <{expr.operator.type}> not implemented.")
+
+    def visit_variable_expr(self, expr: Variable):
+        self.token = expr.name
+        slot = self.lookup(expr.name)
+
+        if slot is None:
+            self.emit(OpCode.GET_GLOBAL, self.constant(expr.name.lexeme))
+        else:
+            self.emit(OpCode.GET_LOCAL, slot)
+
+    def visit_assign_expr(self, expr: Assign):
+        self.assign(expr, store=False)
+
+    def assign(self, expr: Assign, store: bool):
+        # An assignment used as a statement stores and pops in a single instruction.
+        expr.value.accept(self)
+
+        self.token = expr.name
+        slot = self.lookup(expr.name)
+
+        if slot is None:
+            op = OpCode.STORE_GLOBAL if store else OpCode.SET_GLOBAL
+            self.emit(op, self.constant(expr.name.lexeme))
+        else:
+            op = OpCode.STORE_LOCAL if store else OpCode.SET_LOCAL
+            self.emit(op, slot)
+
+    def condition(self, expr: Expr) -> int:
+        # Comparisons feeding a branch are fused with the jump.
+        if isinstance(expr, Binary) and expr.operator.type in self.COMPARE_JUMP:
+            expr.left.accept(self)
+            expr.right.accept(self)
+            self.token = expr.operator
+            return self.emit_jump(self.COMPARE_JUMP[expr.operator.type])
+
+        expr.accept(self)
+        return self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+
+    def define(self, name: Token):
+        self.token = name
+
+        if not self.scopes:
+            self.emit(OpCode.DEFINE_GLOBAL, self.constant(name.lexeme))
+            return
+
+        slot = self.scopes[-1].get(name.lexeme)
+        if slot is None:
+            slot = self.new_local()
+            self.scopes[-1][name.lexeme] = slot
+
+        self.emit(OpCode.STORE_LOCAL, slot)
+
+    def lookup(self, name: Token):
+        for scope in reversed(self.scopes):
+            if name.lexeme in scope:
+                return scope[name.lexeme]
+        return None
+
+    def new_local(self) -> int:
+        # Block locals are flattened into their function's frame; functions
+        # do not capture enclosing scopes so slots never need to outlive it.
+        self.function.locals += 1
+        return self.function.locals - 1
+
+    def constant(self, value) -> int:
+        return self.function.chunk.add_constant(value)
+
+    def emit(self, *code: int) -> int:
+        return self.function.chunk.emit(self.token, *code)
+
+    def emit_jump(self, op: int) -> int:
+        return self.emit(op, -1)
+
+    def patch_jump(self, offset: int):
+        self.function.chunk.code[offset] = len(self.function.chunk.code)
@@ -1,32 +1,48 @@
 from lox_token import Token
 from errors import LoxRuntimeError
+import itertools
 
 class Environment:
-    def __init__(self, enclosing = None):
-        self.__enclosing = enclosing
-        self.__values = dict()
+    """
+    Array-backed frame for locals, indexed by the slots the Resolver assigns.
+    Every local is in the current frame, so frames are not linked to each other.
+    """
+    __slots__ = ("values",)
 
-    def get(self, name: Token) -> object:
-        if name.lexeme in self.__values:
-            return self.__values[name.lexeme]
+    def __init__(self, size: int = 0):
+        self.values = [None] * size
+
+
+class GlobalEnvironment:
+    """
+    Globals by name. version changes whenever a global is defined or assigned,
+    so a lookup cached on a node stays valid while the version it was made at
+    is current. Versions come from one counter shared by every instance, so a
+    cache filled from one environment never matches another.
+    """
+    versions = itertools.count()
 
-        if self.__enclosing is not None:
-            return self.__enclosing.get(name)
+    def __init__(self):
+        self.values = dict()
+        self.version = next(self.versions)
 
-        raise LoxRuntimeError(name, 
+    def get(self, name: Token) -> object:
+        if name.lexeme in self.values:
+            return self.values[name.lexeme]
+
+        raise LoxRuntimeError(name,
             f"Undefined variable '{name.lexeme}'.")
 
     def define(self, name: Token, value: object):
-        self.__values[name.lexeme] = value
+        self.values[name.lexeme] = value
+        self.version = next(self.versions)
 
     def assign(self, name: Token, value: object) -> object:
-        if name.lexeme in self.__values:
-            self.__values[name.lexeme] = value
+        if name.lexeme in self.values:
+            self.values[name.lexeme] = value
+            self.version = next(self.versions)
             return value
 
-        if self.__enclosing is not None:
-            return self.__enclosing.assign(name, value)
-
         raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
 
 class EnvironmentSingleton:
@@ -35,5 +51,5 @@ class EnvironmentSingleton:
     @classmethod
     def get_env(cls):
         if cls.env is None:
-            cls.env = Environment()
+            cls.env = GlobalEnvironment()
         return cls.env
\ No newline at end of file
@@ -1,38 +1,54 @@
 import sys
 from lox_token import Token, TokenType
+from output import Output, STDOUT
+from typing import List, TextIO
 
 class LoxRuntimeError(RuntimeError):
     def __init__(self, token: Token, message):
         super().__init__(message)
         self.token = token
 
-class Error:
-    had_error = False
-    had_runtime_error = False
+class Diagnostics:
+    """
+    Where the scanner, parser, resolver and engines report errors. Every
+    message is kept in messages and written to stream, after flushing the
+    output so the two keep their order.
+    """
+    def __init__(self, output: Output = STDOUT, stream: TextIO = None):
+        self.output = output
+        # Without a stream, whatever sys.stderr is at the time, so redirect_stderr applies.
+        self.stream = stream
+        self.messages: List[str] = []
+        self.had_error = False
+        self.had_runtime_error = False
 
-    @staticmethod
-    def error(line, message):
-        Error.report(line, "", message)
+    def reset(self):
+        self.messages.clear()
+        self.had_error = False
+        self.had_runtime_error = False
 
-    @staticmethod
-    def report(line, where, message):
-        sys.stderr.write(f"[{line}] Error {where}: {message}\n")
-        Error.had_error = True
+    def error(self, line, message):
+        self.report(line, "", message)
 
-    @staticmethod
-    def token_error(token: Token, message):
+    def report(self, line, where, message):
+        self.emit(f"[{line}] Error {where}: {message}")
+        self.had_error = True
+
+    def token_error(self, token: Token, message):
         if token.type == TokenType.EOF:
-            Error.report(token.line, " at end", message)
+            self.report(token.line, " at end", message)
         else:
-            Error.report(token.line, f" at '{token.lexeme}'", message)
+            self.report(token.line, f" at '{token.lexeme}'", message)
+
+    def runtime_error(self, error: LoxRuntimeError):
+        self.emit(f"[line {error.token.line}] {error}")
+        self.had_runtime_error = True
+
+    def emit(self, message: str):
+        self.messages.append(message)
+        self.output.flush()
+        (self.stream or sys.stderr).write(message + "\n")
 
-    @staticmethod
-    def runtime_error(error: LoxRuntimeError):
-        msg = ""
-        if hasattr(LoxRuntimeError, "message"):
-            msg = error.message
-        else:
-            msg = error
 
-        sys.stderr.write(f"[line {error.token.line}] {msg}\n")
-        Error.had_runtime_error = True
\ No newline at end of file
+# What the lox command reports through.
+Error = Diagnostics()
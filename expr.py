@@ -27,12 +27,26 @@ class ExprVisitor(ABC):
 	@abstractmethod
 	def visit_assign_expr(self, name): pass
 
+	# Variants from quickened.py, which visitors that do not know them treat like the node they specialize.
+	def visit_number_binary_expr(self, expr): return self.visit_binary_expr(expr)
+	def visit_plain_binary_expr(self, expr): return self.visit_binary_expr(expr)
+	def visit_generic_binary_expr(self, expr): return self.visit_binary_expr(expr)
+	def visit_number_negate_expr(self, expr): return self.visit_unary_expr(expr)
+	def visit_not_expr(self, expr): return self.visit_unary_expr(expr)
+	def visit_generic_unary_expr(self, expr): return self.visit_unary_expr(expr)
+	def visit_or_expr(self, expr): return self.visit_logical_expr(expr)
+	def visit_and_expr(self, expr): return self.visit_logical_expr(expr)
+
 
 class Expr:
+	__slots__ = ()
+
 	def accept(self, visitor: ExprVisitor) -> object: pass
 
 
 class Conditional(Expr):
+	__slots__ = ("condition", "then_branch", "else_branch")
+
 	def __init__(self, condition: Expr, then_branch: Expr, else_branch: Expr):
 		self.condition = condition
 		self.then_branch = then_branch
@@ -42,6 +56,8 @@ class Conditional(Expr):
 		return visitor.visit_conditional_expr(self)
 
 class Binary(Expr):
+	__slots__ = ("left", "operator", "right")
+
 	def __init__(self, left: Expr, operator: Token, right: Expr):
 		self.left = left
 		self.operator = operator
@@ -51,15 +67,22 @@ class Binary(Expr):
 		return visitor.visit_binary_expr(self)
 
 class Call(Expr):
+	# version and cached: inline cache of a global callee already checked to be callable with this many arguments.
+	__slots__ = ("callee", "paren", "arguments", "version", "cached")
+
 	def __init__(self, callee: Expr, paren: Token, arguments: List[Expr]): 
 		self.callee = callee
 		self.paren = paren
 		self.arguments = arguments
+		self.version = None
+		self.cached = None
 
 	def accept(self, visitor: ExprVisitor):
 		return visitor.visit_call_expr(self)
 
 class Grouping(Expr):
+	__slots__ = ("expression",)
+
 	def __init__(self, expression: Expr):
 		self.expression = expression
 
@@ -67,6 +90,8 @@ class Grouping(Expr):
 		return visitor.visit_grouping_expr(self)
 
 class Literal(Expr):
+	__slots__ = ("value",)
+
 	def __init__(self, value):
 		self.value = value
 
@@ -74,6 +99,8 @@ class Literal(Expr):
 		return visitor.visit_literal_expr(self)	
 
 class Logical(Expr):
+	__slots__ = ("left", "operator", "right")
+
 	def __init__(self, left: Expr, operator: Token, right: Expr):
 		self.left = left
 		self.operator = operator
@@ -83,6 +110,8 @@ class Logical(Expr):
 		return visitor.visit_logical_expr(self)
 
 class Unary(Expr):
+	__slots__ = ("operator", "right")
+
 	def __init__(self, operator: Token, right: Expr):
 		self.operator = operator
 		self.right = right
@@ -91,17 +120,28 @@ class Unary(Expr):
 		return visitor.visit_unary_expr(self)
 
 class Variable(Expr):
+	# version and cached: inline cache of a global, the value read at that version of the globals.
+	__slots__ = ("name", "depth", "slot", "version", "cached")
+
 	def __init__(self, name: Token):
 		self.name = name
+		self.depth = None
+		self.slot = None
+		self.version = None
+		self.cached = None
 
 	def accept(self, visitor: ExprVisitor):
 		return visitor.visit_variable_expr(self)
 
 
 class Assign(Expr):
+	__slots__ = ("name", "value", "depth", "slot")
+
 	def __init__(self, name: Token, value: Expr):
 		self.name = name
 		self.value = value
+		self.depth = None
+		self.slot = None
 	
 	def accept(self, visitor: ExprVisitor):
 		return visitor.visit_assign_expr(self)
\ No newline at end of file
@@ -1,42 +1,67 @@
 from expr import *
 from stmt import *
-from environment import EnvironmentSingleton, Environment
+from environment import EnvironmentSingleton, Environment, GlobalEnvironment
 from lox_token import Token, TokenType
-from lox_callable import LoxCallable, LoxFunction
-from native_functions import LoxClock, LoxPrint
+from lox_callable import LoxCallable, LoxFunction, RETURN
+from native_functions import NATIVES
+from rope import Rope
+from quickened import GenericBinary, GenericUnary, quicken_binary, quicken_unary, quicken_logical
+from output import Output, STDOUT
 from errors import Error, LoxRuntimeError
 from typing import List
-import sys
 
 from printer import AstPrinter
 
 class Interpreter(StmtVisitor, ExprVisitor):
-    def __init__(self):
-        self.globals: Environment = EnvironmentSingleton.get_env()
-        self.environment: Environment = self.globals
-
-        self.globals.define(Token(TokenType.IDENTIFIER, "clock", None, 0), LoxClock())
-        self.globals.define(Token(TokenType.IDENTIFIER, "printf", None, 0), LoxPrint())
+    def __init__(self, globals: GlobalEnvironment = None, errors=Error, output: Output = STDOUT):
+        self.globals: GlobalEnvironment = globals or EnvironmentSingleton.get_env()
+        self.errors = errors
+        self.output = output
+        self.environment: Environment | GlobalEnvironment = self.globals
+        # Set by a return statement for LoxFunction.call to pick up.
+        self.returned = None
+        self.tail_call = None
+        # Called with the function of every call LoxFunction.call makes in place of a returning one, see Profiler.
+        self.tail_call_hook = None
+        # Caches the results of pure functions when set, see memo.Memoizer.
+        self.memoizer = None
+        # Frames of function calls that returned, for the next calls to reuse. Lox functions capture
+        # nothing but the globals, so nothing reaches a frame after its call; its values are dropped
+        # on the way in, so the list keeps no Lox value alive.
+        self.free_environments: List[Environment] = []
+
+        # Once per global environment: a later Interpreter sharing it, like the Optimizer's, must not
+        # replace a program's own definition of one of these names.
+        for name, native in NATIVES.items():
+            if name not in self.globals.values:
+                self.globals.define(Token(TokenType.IDENTIFIER, name, None, 0), native())
 
     def visit_expression_stmt(self, stmt: Expression):
         self.eval(stmt.expression)
 
     def visit_function_stmt(self, stmt: Function):
         function = LoxFunction(stmt)
-        self.environment.define(stmt.name, function)
+        self.define(stmt.name, stmt.slot, function)
 
     def visit_if_stmt(self, stmt: If):
         if self.is_truthy(self.eval(stmt.condition)):
-            self.execute(stmt.then_branch)
+            return self.execute(stmt.then_branch)
         elif stmt.else_branch is not None:
-            self.execute(stmt.else_branch)
+            return self.execute(stmt.else_branch)
 
     def visit_print_stmt(self, stmt: Print):
         value = self.stringify(self.eval(stmt.expression))
-        sys.stdout.write(value + "\n")
+        self.output.write(value + "\n")
 
     def visit_block_stmt(self, stmt: Block):
-        self.execute_block(stmt.statements, Environment(self.environment))
+        if stmt.size is None:
+            # Its variables live in the current environment, see Resolver.
+            for statement in stmt.statements:
+                if self.execute(statement) is RETURN:
+                    return RETURN
+            return None
+
+        return self.execute_block(stmt.statements, Environment(stmt.size))
 
     def visit_declaration_stmt(self, stmt: Var):
         value = None
@@ -44,24 +69,57 @@ class Interpreter(StmtVisitor, ExprVisitor):
         if stmt.initializer is not None:
             value = self.eval(stmt.initializer)
 
-        self.environment.define(stmt.name, value)
+        self.define(stmt.name, stmt.slot, value)
 
     def visit_while_stmt(self, stmt: While):
         while self.is_truthy(self.eval(stmt.condition)):
-            self.execute(stmt.body)
-
-    def visit_binary_expr(self, expr: Binary): 
-        left = self.eval(expr.left)
-        right = self.eval(expr.right)
-        operator = expr.operator
-
+            if self.execute(stmt.body) is RETURN:
+                return RETURN
+
+    def visit_return_stmt(self, stmt: Return):
+        if isinstance(stmt.value, Call):
+            callee, arguments = self.evaluate_call(stmt.value)
+
+            if type(callee) is LoxFunction:
+                self.tail_call = (callee, arguments)
+            else:
+                self.returned = self.call_native(callee, arguments, stmt.value.paren)
+            return RETURN
+
+        self.returned = None if stmt.value is None else self.eval(stmt.value)
+        return RETURN
+
+    def visit_binary_expr(self, expr: Binary):
+        left, right = self.eval(expr.left), self.eval(expr.right)
+        value = self.binary(expr.operator, left, right)
+        # Only reached the first time: the node then specializes itself for these operands.
+        quicken_binary(expr, left, right)
+        return value
+
+    def visit_number_binary_expr(self, expr: Binary):
+        left, right = expr.left.accept(self), expr.right.accept(self)
+        if type(left) is float and type(right) is float:
+            try:
+                return expr.operation(left, right)
+            except ZeroDivisionError:
+                raise LoxRuntimeError(expr.operator, "Division by Zero")
+
+        expr.__class__ = GenericBinary
+        return self.binary(expr.operator, left, right)
+
+    def visit_plain_binary_expr(self, expr: Binary):
+        return expr.operation(expr.left.accept(self), expr.right.accept(self))
+
+    def visit_generic_binary_expr(self, expr: Binary):
+        return self.binary(expr.operator, expr.left.accept(self), expr.right.accept(self))
+
+    def binary(self, operator: Token, left, right):
         match(operator.type):
             case TokenType.PLUS:    
-                if (isinstance(left, float) and isinstance(right, float))   \
-                    or (isinstance(left, str) and isinstance(right, str)):   
+                if isinstance(left, float) and isinstance(right, float):
                     return left + right
-                elif (isinstance(left, str) or isinstance(right, str)):
-                    return str(left) + str(right)
+                elif isinstance(left, (str, Rope)) or isinstance(right, (str, Rope)):
+                    return Rope.concat(left, right)
                 raise LoxRuntimeError(operator, 
                     f"Not supported between operands of type {type(left)} and {type(right)}.")
             
@@ -108,7 +166,30 @@ class Interpreter(StmtVisitor, ExprVisitor):
                raise NotImplementedError(f"Operator type <{operator.type}> not implemented.") 
 
     def visit_call_expr(self, expr: Call):
+        if expr.version == self.globals.version:
+            callee = expr.cached
+            arguments = []
+
+            for arg in expr.arguments:
+                arguments.append(arg.accept(self))
+        else:
+            callee, arguments = self.evaluate_call(expr)
+
+        try:
+            return callee.call(self, arguments)
+        except LoxRuntimeError as error:
+            if error.token is None:
+                error.token = expr.paren
+            raise
+
+    def evaluate_call(self, expr: Call):
+        # The callee and arguments of a call, checked but not yet called.
+        if expr.version == self.globals.version:
+            return expr.cached, [self.eval(arg) for arg in expr.arguments]
+
         callee: LoxCallable = self.eval(expr.callee)
+        # Taken before the arguments run, since they may assign the callee's global.
+        version = self.globals.version
 
         if not isinstance(callee, LoxCallable):
             raise LoxRuntimeError(expr.paren, "Can only call functions and classes")
@@ -121,7 +202,23 @@ class Interpreter(StmtVisitor, ExprVisitor):
         if len(arguments) != callee.arity():
             raise LoxRuntimeError(expr.paren, f"Expected {callee.arity()} args but got {len(arguments)}.")
 
-        return callee.call(self, arguments)
+        self.cache_callee(expr, callee, version)
+        return callee, arguments
+
+    def call_native(self, callee: LoxCallable, arguments: List, paren: Token):
+        try:
+            return callee.call(self, arguments)
+        except LoxRuntimeError as error:
+            # Natives raise without a token, leaving it to the call site.
+            if error.token is None:
+                error.token = paren
+            raise
+
+    def cache_callee(self, expr: Call, callee: LoxCallable, version: int):
+        # Only a global callee can be cached: the version says nothing about locals.
+        if type(expr.callee) is Variable and expr.callee.depth is None:
+            expr.cached = callee
+            expr.version = version
 
     def visit_conditional_expr(self, expr: Conditional):
         condition = self.eval(expr.condition)
@@ -138,6 +235,7 @@ class Interpreter(StmtVisitor, ExprVisitor):
         return expr.value
 
     def visit_logical_expr(self, expr: Logical):
+        quicken_logical(expr)
         left = self.is_truthy(self.eval(expr.left))
         operator = expr.operator
 
@@ -148,27 +246,66 @@ class Interpreter(StmtVisitor, ExprVisitor):
 
         return self.eval(expr.right)
 
-    def visit_unary_expr(self, expr: Unary): 
+    def visit_or_expr(self, expr: Logical):
+        return True if expr.left.accept(self) else expr.right.accept(self)
+
+    def visit_and_expr(self, expr: Logical):
+        return expr.right.accept(self) if expr.left.accept(self) else False
+
+    def visit_unary_expr(self, expr: Unary):
         right = self.eval(expr.right)
+        value = self.unary(expr.operator, right)
+        quicken_unary(expr, right)
+        return value
+
+    def visit_number_negate_expr(self, expr: Unary):
+        right = expr.right.accept(self)
+        if type(right) is float:
+            return -right
+
+        expr.__class__ = GenericUnary
+        return self.unary(expr.operator, right)
 
-        match(expr.operator.type):
+    def visit_not_expr(self, expr: Unary):
+        return not expr.right.accept(self)
+
+    def visit_generic_unary_expr(self, expr: Unary):
+        return self.unary(expr.operator, expr.right.accept(self))
+
+    def unary(self, operator: Token, right):
+        match(operator.type):
             case TokenType.BANG:
                 return not self.is_truthy(right)
 
             case TokenType.MINUS:
-                self.check_number_operand(expr.operator, right)
+                self.check_number_operand(operator, right)
                 return -right
 
             case _:
-                raise NotImplementedError(f"Operator <{expr.operator.type}> not implemented.")
+                raise NotImplementedError(f"Operator <{operator.type}> not implemented.")
 
     def visit_variable_expr(self, expr: Variable):
-        return self.environment.get(expr.name)
+        if expr.depth is None:
+            if expr.version == self.globals.version:
+                return expr.cached
+
+            expr.cached = value = self.globals.get(expr.name)
+            expr.version = self.globals.version
+            return value
+        return self.environment.values[expr.slot]
 
     def visit_assign_expr(self, expr: Assign):
         value = self.eval(expr.value)
-        self.environment.assign(expr.name, value)
-        return value 
+        if expr.depth is None:
+            return self.globals.assign(expr.name, value)
+        self.environment.values[expr.slot] = value
+        return value
+
+    def define(self, name: Token, slot: int, value):
+        if slot is None:
+            self.globals.define(name, value)
+        else:
+            self.environment.values[slot] = value
 
     def check_number_operand(self, operator: Token, operand):
         if not isinstance(operand, float):
@@ -201,10 +338,10 @@ class Interpreter(StmtVisitor, ExprVisitor):
             for statement in statements:
                 self.execute(statement)
         except LoxRuntimeError as e:
-            Error.runtime_error(e)
+            self.errors.runtime_error(e)
 
     def execute(self, stmt: Stmt):
-        stmt.accept(self)
+        return stmt.accept(self)
 
     def execute_block(self, statements: List[Stmt], environment: Environment):
         previous = self.environment
@@ -213,7 +350,8 @@ class Interpreter(StmtVisitor, ExprVisitor):
             self.environment = environment
 
             for statement in statements:
-                self.execute(stmt=statement)
+                if self.execute(stmt=statement) is RETURN:
+                    return RETURN
 
         finally:
             self.environment = previous
\ No newline at end of file
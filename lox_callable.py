@@ -12,18 +12,67 @@ class LoxCallable(ABC):
     def arity(self) -> int: pass
 
 
+# Returned by executing a statement when a return statement ended the function
+# early. The interpreter keeps the value returned, or the call to make in its
+# place, so unwinding needs no exception.
+RETURN = object()
+
+# Returned by FunctionMemo.get when the arguments are not cached.
+MISSING = object()
+
+
+
 class LoxFunction(LoxCallable):
     def __init__(self, declaration: Function):
         self.declaration = declaration
+        # Worked out once instead of on every call: the arity, and the slots of the frame past the
+        # parameters, which the arguments are extended with to make its values.
+        self.parameter_count = len(declaration.parameters)
+        self.locals = [None] * (declaration.size - self.parameter_count)
 
     def call(self, interpreter, arguments: List):
-        self.environment = Environment(interpreter.globals)
+        function = self
+        memoizer = interpreter.memoizer
+        free = interpreter.free_environments
+        # Memos and keys of the calls in this tail call chain that missed; they all share its result.
+        misses = None
+
+        # Calls in tail position are left to this loop, so tail recursion runs in constant Python stack.
+        while True:
+            memo = None if memoizer is None else memoizer.memo(function)
+            if memo is not None:
+                key = memo.key(arguments)
+                if key is not None:
+                    result = memo.get(key)
+                    if result is not MISSING:
+                        break
+                    misses = misses or []
+                    misses.append((memo, key))
+
+            environment = free.pop() if free else Environment()
+            environment.values = arguments + function.locals
+            status = interpreter.execute_block(function.declaration.body, environment)
+            environment.values = None
+            free.append(environment)
+
+            if status is not RETURN:
+                result = None
+                break
+
+            if interpreter.tail_call is None:
+                result = interpreter.returned
+                break
 
-        for parameter, argument in zip(self.declaration.parameters, arguments):
-            self.environment.define(parameter, argument)
+            function, arguments = interpreter.tail_call
+            interpreter.tail_call = None
+            if interpreter.tail_call_hook is not None:
+                interpreter.tail_call_hook(function)
 
-        interpreter.execute_block(self.declaration.body, self.environment)
+        if misses is not None:
+            for memo, key in misses:
+                memo.put(key, result)
+        return result
 
-    def arity(self): return len(self.declaration.parameters)
+    def arity(self): return self.parameter_count
 
     def __str__(self): return f"<fun {self.declaration.name.lexeme}>"
\ No newline at end of file
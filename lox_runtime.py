@@ -0,0 +1,194 @@
+from dataclasses import dataclass, field
+from scanner import FastScanner
+from parser import Parser, ParseError
+from resolver import Resolver
+from optimizer import Optimizer
+from memo import Memoizer
+from interpreter import Interpreter
+from stack_interpreter import StackInterpreter
+from closure_compiler import ClosureCompiler
+from transpiler import PythonEngine
+from compiler import Compiler
+from vm import VM
+from environment import GlobalEnvironment
+from lox_token import Token, TokenType
+from errors import Diagnostics, LoxRuntimeError
+from output import Output
+from stmt import Stmt
+from typing import Dict, List, TextIO
+import asyncio
+import io
+import math
+import time
+
+
+@dataclass(slots=True)
+class RunResult:
+    # 0, or the status the lox command exits with: 65 for a syntax error, 70 for a runtime error.
+    status: int
+    # What the program printed, unless it went to a stream given to run().
+    output: str
+    errors: List[str] = field(default_factory=list)
+
+
+class LoxRuntime:
+    """
+    Interpreter for embedding Lox in a Python program.
+
+    Each runtime owns its globals, its error state and its output, so any
+    number of them can run side by side, in the same thread or in several.
+    Globals persist from one run() to the next, like lines typed at the
+    prompt. Errors are returned in the result instead of ending the process.
+    Values passed in globals must already be Lox values: float, str, bool,
+    None or a LoxCallable.
+
+        runtime = LoxRuntime(globals={"limit": 10.0})
+        result = runtime.run("print limit * 2;")
+        result.output   # "20\\n"
+    """
+    ENGINES = ("tree", "stack", "vm", "closure", "python")
+
+    def __init__(self, engine: str = "tree", optimize: bool = True, globals: Dict[str, object] = None,
+                 memoize: bool = True):
+        if engine not in LoxRuntime.ENGINES:
+            raise ValueError(f"unknown engine {engine!r}, expected one of {', '.join(LoxRuntime.ENGINES)}")
+
+        self.engine = engine
+        self.optimize = optimize
+        self.output = Output(io.StringIO(), Output.EXIT)
+        self.errors = Diagnostics(self.output, io.StringIO())
+        # Hits and misses per function stay in memoizer.memos; only the tree engine memoizes.
+        self.memoizer = Memoizer() if memoize and engine == "tree" else None
+
+        if engine == "vm":
+            self.vm = VM(dict(globals or {}), self.errors, self.output)
+            self.run_statements = lambda statements: self.vm.interpret(Compiler().compile(statements))
+        else:
+            environment = GlobalEnvironment()
+            for name, value in (globals or {}).items():
+                environment.define(Token(TokenType.IDENTIFIER, name, None, 0), value)
+
+            interpreter_class = StackInterpreter if engine == "stack" else Interpreter
+            self.interpreter = interpreter_class(environment, self.errors, self.output)
+            if self.memoizer is not None:
+                self.memoizer.attach(self.interpreter)
+            self.run_statements = {
+                "closure": ClosureCompiler,
+                "python": PythonEngine,
+            }.get(engine, lambda interpreter: interpreter)(self.interpreter).interpret
+
+    @property
+    def globals(self) -> Dict[str, object]:
+        """The runtime's globals by name, natives included."""
+        return self.vm.globals if self.engine == "vm" else self.interpreter.globals.values
+
+    def run(self, source: str, stdout: TextIO = None, stderr: TextIO = None) -> RunResult:
+        """
+        Runs source against the runtime's globals. What it prints goes to
+        stdout, or is returned in the result without one; errors are always
+        returned and also written to stderr if given.
+        """
+        captured = self.begin(stdout, stderr)
+        try:
+            statements = self.prepare(source)
+            if statements is not None:
+                self.run_statements(statements)
+        finally:
+            self.output.flush()
+
+        return self.result(captured)
+
+    def begin(self, stdout: TextIO, stderr: TextIO) -> io.StringIO | None:
+        # Returns the buffer capturing the output when there is no stdout.
+        captured = io.StringIO() if stdout is None else None
+        self.output.stream = stdout or captured
+        self.errors.stream = stderr or io.StringIO()
+        self.errors.reset()
+        return captured
+
+    def result(self, captured: io.StringIO | None) -> RunResult:
+        status = 65 if self.errors.had_error else 70 if self.errors.had_runtime_error else 0
+        return RunResult(status, "" if captured is None else captured.getvalue(), list(self.errors.messages))
+
+    def prepare(self, source: str) -> List[Stmt] | None:
+        """Parses, optimizes and resolves source, returning None after a syntax error."""
+        statements = self.parse(source)
+        if self.errors.had_error:
+            return None
+
+        if self.optimize:
+            # Functions defined by earlier runs may assign any global, which this source alone does not show.
+            statements = Optimizer(propagate_globals=False).optimize(statements)
+
+        Resolver(self.errors).resolve(statements)
+        return None if self.errors.had_error else statements
+
+    def parse(self, source: str) -> List[Stmt]:
+        tokens = FastScanner(source, self.errors).scan_tokens()
+        try:
+            return Parser(tokens, self.errors).parse()
+        except ParseError:
+            # Already reported; the parser does not recover from it, so nothing else is parsed.
+            return []
+
+
+class AsyncLoxRuntime(LoxRuntime):
+    """
+    LoxRuntime for asyncio, so many scripts can share one event loop.
+
+    Scripts run on the stack engine, which hands control back to the event
+    loop every steps_per_yield loop iterations and calls. A script that
+    goes over max_steps of them, or runs for longer than timeout seconds,
+    stops with a runtime error, leaving the runtime usable for the next run.
+    Only one run of a runtime may be in progress at a time.
+
+        result = await AsyncLoxRuntime(max_steps=1e6, timeout=0.5).run(source)
+    """
+    STEPS_PER_YIELD = 1000
+
+    def __init__(self, optimize: bool = True, globals: Dict[str, object] = None,
+                 max_steps: float = math.inf, timeout: float = math.inf, steps_per_yield: int = STEPS_PER_YIELD):
+        super().__init__("stack", optimize, globals)
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.steps_per_yield = steps_per_yield
+
+    async def run(self, source: str, stdout: TextIO = None, stderr: TextIO = None) -> RunResult:
+        captured = self.begin(stdout, stderr)
+        try:
+            statements = self.prepare(source)
+            if statements is not None:
+                await self.run_steps(statements)
+        finally:
+            self.output.flush()
+
+        return self.result(captured)
+
+    async def run_steps(self, statements: List[Stmt]):
+        interpreter = self.interpreter
+        deadline = time.monotonic() + self.timeout
+        steps = self.max_steps
+
+        interpreter.start(statements)
+        try:
+            while True:
+                budget = min(self.steps_per_yield, steps)
+                if interpreter.run(budget):
+                    break
+
+                steps -= budget
+                if not steps:
+                    raise self.stopped(f"Script exceeded its limit of {self.max_steps:g} steps.")
+                if time.monotonic() >= deadline:
+                    raise self.stopped(f"Script exceeded its time limit of {self.timeout:g} seconds.")
+
+                await asyncio.sleep(0)
+        except LoxRuntimeError as e:
+            self.errors.runtime_error(e)
+        finally:
+            # Also after a cancellation, so the next run starts from a clean state.
+            interpreter.reset()
+
+    def stopped(self, message: str) -> LoxRuntimeError:
+        # Reported at the loop or call the script was in when it was stopped.
+        return LoxRuntimeError(Token(TokenType.EOF, "", None, self.interpreter.paused_line), message)
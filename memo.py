@@ -0,0 +1,190 @@
+from collections import OrderedDict
+from expr import *
+from stmt import *
+from environment import GlobalEnvironment
+from lox_callable import LoxFunction, MISSING
+from native_functions import NativeFunction
+from optimizer import AssignedNames
+from rope import Rope
+from typing import Dict, List, Set, TextIO, Tuple
+import math
+
+# Values a memoized call may take as arguments. Arrays can change between two calls and a
+# function argument may print, so calls passing either always run.
+KEY_TYPES = frozenset((float, str, Rope, bool, type(None)))
+
+
+class Effects(AssignedNames):
+    """What a function body does outside its own locals: whether it prints or assigns a global, and which globals it reads."""
+    def __init__(self):
+        super().__init__()
+        self.prints = False
+        self.global_assignments = False
+        self.reads: Set[str] = set()
+
+    def visit_print_stmt(self, stmt: Print):
+        self.prints = True
+        super().visit_print_stmt(stmt)
+
+    def visit_variable_expr(self, expr: Variable):
+        if expr.depth is None:
+            self.reads.add(expr.name.lexeme)
+
+    def visit_assign_expr(self, expr: Assign):
+        if expr.depth is None:
+            self.global_assignments = True
+        super().visit_assign_expr(expr)
+
+
+class FunctionMemo:
+    """
+    Results of one function declaration by arguments, least recently used
+    first. bindings holds every global the function reaches, directly or
+    through the functions it calls, with the value it had when the function
+    was analyzed; the analysis and the results only hold while all of them
+    are unchanged, which was last checked at the globals' version.
+    """
+    __slots__ = ("name", "enabled", "bindings", "version", "results", "size", "hits", "misses")
+
+    # Lookups after which a function that hits less than one time in ten stops being cached.
+    TRIAL = 1000
+
+    def __init__(self, name: str, pure: bool, bindings: Tuple, version: int, size: int):
+        self.name = name
+        # Whether calls go through the cache: the function is pure and caching it pays off so far.
+        self.enabled = pure
+        self.bindings = bindings
+        self.version = version
+        self.results = OrderedDict()
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def current(self, globals: GlobalEnvironment) -> bool:
+        values = globals.values
+        for name, value in self.bindings:
+            if values.get(name) is not value:
+                return False
+        self.version = globals.version
+        return True
+
+    @staticmethod
+    def key(arguments: List):
+        """Key of a call with these arguments, or None when its result must not be cached."""
+        types = tuple(map(type, arguments))
+        if not KEY_TYPES.issuperset(types):
+            return None
+
+        # Types keep true apart from 1, which it equals in Python; 0 and -0 are equal too, but 1 / x tells them apart.
+        if 0.0 in arguments:
+            arguments = [(value, math.copysign(1.0, value)) if type(value) is float else value for value in arguments]
+        return types, tuple(arguments)
+
+    def get(self, key):
+        result = self.results.get(key, MISSING)
+        if result is MISSING:
+            self.misses += 1
+            if self.misses % FunctionMemo.TRIAL == 0 and self.hits * 10 < self.misses:
+                # Arguments rarely repeat: building keys and storing results only costs.
+                self.enabled = False
+                self.results.clear()
+        else:
+            self.hits += 1
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        # Only a result that cannot change is shared: a returned array belongs to its caller. The
+        # miss that ended the trial comes back here too, after get() emptied the disabled memo.
+        if self.enabled and (type(result) in KEY_TYPES or isinstance(result, LoxFunction)):
+            self.results[key] = result
+            if len(self.results) > self.size:
+                self.results.popitem(last=False)
+
+
+class Memoizer:
+    """
+    Caches the results of pure Lox functions for the tree walking interpreter.
+
+    A function is pure when neither it nor any function it can reach prints
+    or assigns a global, and every global it reads holds a number, string,
+    boolean, nil, a pure function or a native without side effects. Since
+    Lox functions capture nothing but the globals, its result then only
+    depends on its arguments. Purity is decided on first call and again
+    whenever one of the globals it depends on changes, which also drops
+    the cached results. Each function keeps at most size results, and one
+    whose arguments rarely repeat stops being cached after a trial.
+
+    attach() makes an Interpreter use it; LoxFunction.call does the rest.
+    """
+    SIZE = 4096
+
+    def __init__(self, size: int = SIZE, stats: bool = False):
+        self.size = size
+        # Whether finish() reports hits and misses.
+        self.stats = stats
+        self.globals: GlobalEnvironment = None
+        self.memos: Dict[Function, FunctionMemo] = dict()
+        self.effects: Dict[Function, Effects] = dict()
+
+    def attach(self, interpreter):
+        self.globals = interpreter.globals
+        interpreter.memoizer = self
+
+    def finish(self, out: TextIO):
+        if self.stats:
+            self.report(out)
+
+    def memo(self, function: LoxFunction) -> FunctionMemo | None:
+        """The memo of function if its calls go through the cache, None otherwise."""
+        declaration = function.declaration
+        memo = self.memos.get(declaration)
+
+        # A memo without bindings depends on no global, so it never goes stale.
+        if memo is None or memo.version != self.globals.version and memo.bindings and not memo.current(self.globals):
+            previous, memo = memo, self.analyze(declaration)
+            if previous is not None:
+                memo.hits, memo.misses = previous.hits, previous.misses
+            self.memos[declaration] = memo
+
+        return memo if memo.enabled else None
+
+    def analyze(self, declaration: Function) -> FunctionMemo:
+        values = self.globals.values
+        bindings: Dict[str, object] = dict()
+        pending = [declaration]
+        seen = {declaration}
+        pure = True
+
+        while pending and pure:
+            effects = self.effects_of(pending.pop())
+            if effects.prints or effects.global_assignments:
+                pure = False
+                break
+
+            for name in effects.reads:
+                value = bindings[name] = values.get(name)
+                if type(value) is LoxFunction:
+                    if value.declaration not in seen:
+                        seen.add(value.declaration)
+                        pending.append(value.declaration)
+                elif not (type(value) in KEY_TYPES or isinstance(value, NativeFunction) and value.pure):
+                    pure = False
+                    break
+
+        return FunctionMemo(declaration.name.lexeme, pure, tuple(bindings.items()), self.globals.version, self.size)
+
+    def effects_of(self, declaration: Function) -> Effects:
+        effects = self.effects.get(declaration)
+        if effects is None:
+            effects = self.effects[declaration] = Effects()
+            effects.collect(declaration.body)
+        return effects
+
+    def report(self, out: TextIO):
+        memos = sorted((memo for memo in self.memos.values() if memo.hits or memo.misses),
+                       key=lambda memo: memo.hits, reverse=True)
+
+        out.write(f"{'memoized function':24} {'hits':>10} {'misses':>10} {'cached':>8}\n")
+        for memo in memos:
+            out.write(f"{memo.name:24} {memo.hits:10d} {memo.misses:10d} {len(memo.results):8d}\n")
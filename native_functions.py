@@ -1,14 +1,184 @@
 from lox_callable import LoxCallable
+from errors import LoxRuntimeError
+from array import array
+from operator import add, mul
 from time import time
+from typing import Dict
+
+# Natives raise LoxRuntimeError without a token; the call site fills in its own.
+
+
+class NativeFunction(LoxCallable):
+    # Whether the result only depends on the arguments and nothing but arrays passed in is changed, for Memoizer.
+    pure = True
+
+    def __str__(self): return "<native_fun>"
+
+
+class LoxClock(NativeFunction):
+    pure = False
 
-class LoxClock(LoxCallable):
     def arity(self): return 0
     def call(self, interpreter, arguments): return time()
-    def __str__(self): return "<native_fun>"    
 
 
-class LoxPrint(LoxCallable):
+class LoxPrint(NativeFunction):
+    pure = False
+
+    def arity(self): return 1
+    def call(self, interpreter, arguments):
+        interpreter.output.write(interpreter.stringify(arguments[0]) + "\n")
+
+
+class LoxArray:
+    """Fixed size array of numbers, stored unboxed in an array('d')."""
+    __slots__ = ("values",)
+
+    def __init__(self, values: array):
+        self.values = values
+
+    def __str__(self):
+        # Numbers are formatted like Interpreter.stringify formats them.
+        return "[" + ", ".join(str(value)[:-2] if str(value).endswith(".0") else str(value)
+                               for value in self.values) + "]"
+
+
+def array_argument(value) -> array:
+    if not isinstance(value, LoxArray):
+        raise LoxRuntimeError(None, "Operand must be an array")
+    return value.values
+
+
+def number_argument(value) -> float:
+    if not isinstance(value, float):
+        raise LoxRuntimeError(None, "Operand must be a number")
+    return value
+
+
+def index_argument(value, length: int) -> int:
+    if not (isinstance(value, float) and value.is_integer()):
+        raise LoxRuntimeError(None, "Array index must be an integer")
+
+    index = int(value)
+    if not 0 <= index < length:
+        raise LoxRuntimeError(None, f"Array index {index} out of range for length {length}")
+    return index
+
+
+def same_length(left: array, right: array):
+    if len(left) != len(right):
+        raise LoxRuntimeError(None, f"Arrays have different lengths {len(left)} and {len(right)}")
+
+
+class LoxArrayNew(NativeFunction):
+    def arity(self): return 1
+    def call(self, interpreter, arguments):
+        size = arguments[0]
+        if not (isinstance(size, float) and size.is_integer() and size >= 0):
+            raise LoxRuntimeError(None, "Array size must be a non-negative integer")
+        return LoxArray(array("d", [0.0]) * int(size))
+
+
+class LoxArrayGet(NativeFunction):
+    def arity(self): return 2
+    def call(self, interpreter, arguments):
+        values = array_argument(arguments[0])
+        return values[index_argument(arguments[1], len(values))]
+
+
+class LoxArraySet(NativeFunction):
+    def arity(self): return 3
+    def call(self, interpreter, arguments):
+        values = array_argument(arguments[0])
+        values[index_argument(arguments[1], len(values))] = number_argument(arguments[2])
+        return arguments[2]
+
+
+class LoxLength(NativeFunction):
+    def arity(self): return 1
+    def call(self, interpreter, arguments):
+        return float(len(array_argument(arguments[0])))
+
+
+class LoxSlice(NativeFunction):
+    def arity(self): return 3
+    def call(self, interpreter, arguments):
+        values = array_argument(arguments[0])
+        # Bounds are inclusive of the length, so index_argument checks them against one more.
+        start = index_argument(arguments[1], len(values) + 1)
+        end = index_argument(arguments[2], len(values) + 1)
+        if start > end:
+            raise LoxRuntimeError(None, f"Slice start {start} is after its end {end}")
+        return LoxArray(values[start:end])
+
+
+class LoxSum(NativeFunction):
+    def arity(self): return 1
+    def call(self, interpreter, arguments):
+        return sum(array_argument(arguments[0]), 0.0)
+
+
+class LoxDot(NativeFunction):
+    def arity(self): return 2
+    def call(self, interpreter, arguments):
+        left, right = array_argument(arguments[0]), array_argument(arguments[1])
+        same_length(left, right)
+        return sum(map(mul, left, right), 0.0)
+
+
+class LoxScale(NativeFunction):
+    def arity(self): return 2
+    def call(self, interpreter, arguments):
+        values = array_argument(arguments[0])
+        return LoxArray(array("d", map(number_argument(arguments[1]).__mul__, values)))
+
+
+class LoxAdd(NativeFunction):
+    def arity(self): return 2
+    def call(self, interpreter, arguments):
+        left, right = array_argument(arguments[0]), array_argument(arguments[1])
+        same_length(left, right)
+        return LoxArray(array("d", map(add, left, right)))
+
+
+class LoxMin(NativeFunction):
+    def arity(self): return 1
+    def call(self, interpreter, arguments):
+        values = array_argument(arguments[0])
+        if not values:
+            raise LoxRuntimeError(None, "Array is empty")
+        return min(values)
+
+
+class LoxMax(NativeFunction):
+    def arity(self): return 1
+    def call(self, interpreter, arguments):
+        values = array_argument(arguments[0])
+        if not values:
+            raise LoxRuntimeError(None, "Array is empty")
+        return max(values)
+
+
+class LoxSort(NativeFunction):
     def arity(self): return 1
     def call(self, interpreter, arguments):
-        print(interpreter.stringify(arguments[0]))
-    def __str__(self): return "<native_fun>"
\ No newline at end of file
+        return LoxArray(array("d", sorted(array_argument(arguments[0]))))
+
+
+# Every native function, by the global name it is defined under.
+NATIVES: Dict[str, type] = {
+    "clock": LoxClock,
+    "printf": LoxPrint,
+    "array": LoxArrayNew,
+    "get": LoxArrayGet,
+    "set": LoxArraySet,
+    "len": LoxLength,
+    "slice": LoxSlice,
+    "sum": LoxSum,
+    "dot": LoxDot,
+    "scale": LoxScale,
+    "add": LoxAdd,
+    "min": LoxMin,
+    "max": LoxMax,
+    "sort": LoxSort,
+}
@@ -0,0 +1,289 @@
+from expr import *
+from stmt import *
+from lox_token import TokenType
+from interpreter import Interpreter
+from environment import GlobalEnvironment
+from rope import Rope
+from errors import LoxRuntimeError
+from typing import Dict, List, Set
+
+
+class AssignedNames(StmtVisitor, ExprVisitor):
+    """Collects every name that is the target of an assignment anywhere in the program."""
+    def __init__(self):
+        self.names: Set[str] = set()
+        self.pending: List[Expr] = []
+
+    def collect(self, statements: List[Stmt]) -> Set[str]:
+        for statement in statements:
+            statement.accept(self)
+        return self.names
+
+    def visit_expression_stmt(self, stmt: Expression):
+        self.expression(stmt.expression)
+
+    def visit_function_stmt(self, stmt: Function):
+        self.collect(stmt.body)
+
+    def visit_if_stmt(self, stmt: If):
+        self.expression(stmt.condition)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.expression(stmt.expression)
+
+    def visit_block_stmt(self, stmt: Block):
+        self.collect(stmt.statements)
+
+    def visit_declaration_stmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            self.expression(stmt.initializer)
+
+    def visit_while_stmt(self, stmt: While):
+        self.expression(stmt.condition)
+        stmt.body.accept(self)
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is not None:
+            self.expression(stmt.value)
+
+    def visit_conditional_expr(self, expr: Conditional):
+        self.pending.extend((expr.else_branch, expr.then_branch, expr.condition))
+
+    def visit_binary_expr(self, expr: Binary):
+        self.pending.extend((expr.right, expr.left))
+
+    def visit_call_expr(self, expr: Call):
+        self.pending.extend(reversed(expr.arguments))
+        self.pending.append(expr.callee)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.pending.append(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+    def visit_logical_expr(self, expr: Logical):
+        self.pending.extend((expr.right, expr.left))
+
+    def visit_unary_expr(self, expr: Unary):
+        self.pending.append(expr.right)
+
+    def visit_variable_expr(self, expr: Variable):
+        pass
+
+    def visit_assign_expr(self, expr: Assign):
+        self.names.add(expr.name.lexeme)
+        self.pending.append(expr.value)
+
+    def expression(self, expr: Expr):
+        # Walked with an explicit stack, like Resolver.resolve_expression, for operator chains deeper than the recursion limit.
+        self.pending.append(expr)
+        while self.pending:
+            self.pending.pop().accept(self)
+
+
+# Globals of the interpreter folding constants. Folding never reads a global, so every
+# Optimizer shares these instead of touching the globals of the program it optimizes.
+FOLDING_GLOBALS = GlobalEnvironment()
+
+
+class Optimizer(StmtVisitor, ExprVisitor):
+    """
+    Simplifies the trees produced by the Parser before they are resolved.
+
+    Operators over literals are folded, variables that are declared with a
+    literal and never assigned are replaced by their value, and branches or
+    loops whose condition is a constant are pruned. Anything that would raise
+    a runtime error is left untouched so the error still happens at its line.
+
+    Constants are only propagated within the code that follows their
+    declaration: a function body may run before a global it mentions is
+    declared, so globals are never propagated into functions. When the
+    statements are not the whole program, as in a runtime whose globals
+    outlive each run, code run before may assign any global, so with
+    propagate_globals off only locals are propagated.
+    """
+    def __init__(self, propagate_globals: bool = True):
+        self.evaluator = Interpreter(FOLDING_GLOBALS)
+        self.propagate_globals = propagate_globals
+        self.assigned: Set[str] = set()
+        self.scopes: List[Dict[str, Literal]] = [dict()]
+        self.global_scope = self.scopes[0]
+
+    def optimize(self, statements: List[Stmt]) -> List[Stmt]:
+        self.assigned = AssignedNames().collect(statements)
+
+        try:
+            return self.statements(statements)
+        except RecursionError:
+            # Nesting deeper than Python's recursion limit, such as a very long operator chain.
+            # Every rewrite already made is equivalent to the node it replaced, so the
+            # partly optimized statements are still correct to run.
+            return statements
+
+    def statements(self, statements: List[Stmt]) -> List[Stmt]:
+        optimized = []
+        for statement in statements:
+            statement = statement.accept(self)
+            if statement is not None:
+                optimized.append(statement)
+        return optimized
+
+    def statement(self, stmt: Stmt) -> Stmt:
+        # Used where the grammar requires a statement; a pruned one becomes an empty block.
+        optimized = stmt.accept(self)
+        if optimized is None:
+            optimized = Block([])
+            optimized.line = stmt.line
+        return optimized
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression = stmt.expression.accept(self)
+        if isinstance(stmt.expression, Literal):
+            return None
+        return stmt
+
+    def visit_function_stmt(self, stmt: Function):
+        self.declare(stmt.name, None)
+
+        enclosing = self.scopes
+        self.scopes = [{parameter.lexeme: None for parameter in stmt.parameters}]
+        stmt.body = self.statements(stmt.body)
+        self.scopes = enclosing
+
+        return stmt
+
+    def visit_if_stmt(self, stmt: If):
+        stmt.condition = stmt.condition.accept(self)
+
+        if isinstance(stmt.condition, Literal):
+            if self.evaluator.is_truthy(stmt.condition.value):
+                return stmt.then_branch.accept(self)
+            if stmt.else_branch is not None:
+                return stmt.else_branch.accept(self)
+            return None
+
+        stmt.then_branch = self.statement(stmt.then_branch)
+        if stmt.else_branch is not None:
+            stmt.else_branch = self.statement(stmt.else_branch)
+        return stmt
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression = stmt.expression.accept(self)
+        return stmt
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes.append(dict())
+        stmt.statements = self.statements(stmt.statements)
+        self.scopes.pop()
+
+        if not stmt.statements:
+            return None
+        return stmt
+
+    def visit_declaration_stmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer = stmt.initializer.accept(self)
+
+        if stmt.initializer is None:
+            self.declare(stmt.name, Literal(None))
+        elif isinstance(stmt.initializer, Literal):
+            self.declare(stmt.name, stmt.initializer)
+        else:
+            self.declare(stmt.name, None)
+
+        return stmt
+
+    def visit_while_stmt(self, stmt: While):
+        stmt.condition = stmt.condition.accept(self)
+
+        if isinstance(stmt.condition, Literal) and not self.evaluator.is_truthy(stmt.condition.value):
+            return None
+
+        stmt.body = self.statement(stmt.body)
+        return stmt
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value = stmt.value.accept(self)
+        return stmt
+
+    def visit_conditional_expr(self, expr: Conditional):
+        expr.condition = expr.condition.accept(self)
+
+        if isinstance(expr.condition, Literal):
+            if self.evaluator.is_truthy(expr.condition.value):
+                return expr.then_branch.accept(self)
+            return expr.else_branch.accept(self)
+
+        expr.then_branch = expr.then_branch.accept(self)
+        expr.else_branch = expr.else_branch.accept(self)
+        return expr
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left = expr.left.accept(self)
+        expr.right = expr.right.accept(self)
+
+        if isinstance(expr.left, Literal) and isinstance(expr.right, Literal):
+            return self.fold(expr)
+        return expr
+
+    def visit_call_expr(self, expr: Call):
+        expr.callee = expr.callee.accept(self)
+        expr.arguments = [argument.accept(self) for argument in expr.arguments]
+        return expr
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        return expr
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left = expr.left.accept(self)
+
+        if isinstance(expr.left, Literal):
+            left = self.evaluator.is_truthy(expr.left.value)
+            if expr.operator.type == TokenType.OR and left:
+                return Literal(True)
+            if expr.operator.type == TokenType.AND and not left:
+                return Literal(False)
+            return expr.right.accept(self)
+
+        expr.right = expr.right.accept(self)
+        return expr
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right = expr.right.accept(self)
+
+        if isinstance(expr.right, Literal):
+            return self.fold(expr)
+        return expr
+
+    def visit_variable_expr(self, expr: Variable):
+        for scope in reversed(self.scopes):
+            if expr.name.lexeme in scope:
+                constant = scope[expr.name.lexeme]
+                return expr if constant is None else Literal(constant.value)
+        return expr
+
+    def visit_assign_expr(self, expr: Assign):
+        expr.value = expr.value.accept(self)
+        return expr
+
+    def declare(self, name: Token, constant: Literal):
+        if name.lexeme in self.assigned or not self.propagate_globals and self.scopes[-1] is self.global_scope:
+            constant = None
+        self.scopes[-1][name.lexeme] = constant
+
+    def fold(self, expr: Expr) -> Expr:
+        try:
+            value = self.evaluator.eval(expr)
+        except LoxRuntimeError:
+            return expr
+
+        # The other engines expect literals to hold plain strings.
+        return Literal(str(value) if isinstance(value, Rope) else value)
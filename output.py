@@ -0,0 +1,58 @@
+from typing import List, TextIO
+import sys
+
+
+class Output:
+    """
+    Buffer between what Lox programs print and a stream.
+
+    Every engine writes through the write method of its interpreter's Output,
+    which only appends to a list; the text reaches the stream in one write
+    per flush. The policy decides when that happens: after every print
+    ("line"), once BLOCK_SIZE characters are waiting ("block") or only at
+    exit ("exit"). Whatever the policy, errors are reported after a flush,
+    so output and errors keep their order.
+    """
+    LINE, BLOCK, EXIT = "line", "block", "exit"
+    POLICIES = (LINE, BLOCK, EXIT)
+    BLOCK_SIZE = 1 << 16
+
+    def __init__(self, stream: TextIO = None, policy: str = None):
+        # Without a stream, whatever sys.stdout is at flush time, so redirect_stdout applies.
+        self.stream = stream
+        self.parts: List[str] = []
+        self.size = 0
+        # Characters waiting that trigger a flush, set by the policy.
+        self.limit = Output.BLOCK_SIZE
+        self.set_policy(policy or self.default_policy())
+
+    def default_policy(self) -> str:
+        # Someone watching a terminal expects each line as it is printed.
+        stream = self.stream or sys.stdout
+        return Output.LINE if stream.isatty() else Output.BLOCK
+
+    def set_policy(self, policy: str):
+        self.flush()
+        self.limit = {
+            Output.LINE: 1,
+            Output.BLOCK: Output.BLOCK_SIZE,
+            Output.EXIT: float("inf"),
+        }[policy]
+
+    def write(self, text: str):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self):
+        stream = self.stream or sys.stdout
+        if self.parts:
+            stream.write("".join(self.parts))
+            self.parts.clear()
+            self.size = 0
+        stream.flush()
+
+
+# What the lox command prints through.
+STDOUT = Output()
@@ -2,26 +2,30 @@ from lox_token import Token, TokenType
 from errors import Error
 from expr import *
 from stmt import *
-from typing import List
+from typing import Iterator, List
 from printer import AstPrinter
 
 class Parser:
-    def __init__(self, tokens: List[Token]):
+    def __init__(self, tokens: List[Token], errors=Error):
+        self.errors = errors
         self.tokens = tokens
         self.current = 0
 
     def parse(self) -> List[Stmt]:
-        statements: List[Stmt] = []
-        
-        while not self.is_at_end():
-            statements.append(self.declaration())
+        return list(self.declarations())
 
-        return statements
+    def declarations(self) -> Iterator[Stmt]:
+        while not self.is_at_end():
+            yield self.declaration()
 
     def declaration(self):
-        if self.match(TokenType.VAR): return self.var_declaration()
-        if self.match(TokenType.FUN): return self.fun_declaration()
-        return self.statement()
+        line = self.peek().line
+        if self.match(TokenType.VAR): stmt = self.var_declaration()
+        elif self.match(TokenType.FUN): stmt = self.fun_declaration()
+        else: return self.statement()
+
+        stmt.line = line
+        return stmt
 
     def var_declaration(self):
         name = self.consume(TokenType.IDENTIFIER, "Expect variable name")
@@ -59,12 +63,17 @@ class Parser:
         return Function(name, parameters, body)
 
     def statement(self):
-        if self.match(TokenType.IF): return self.if_statement()
-        if self.match(TokenType.FOR): return self.for_statement()
-        if self.match(TokenType.PRINT): return self.print_statement()
-        if self.match(TokenType.WHILE): return self.while_statement()
-        if self.match(TokenType.LEFT_BRACE): return Block(self.block_statement())
-        return self.expression_statement()
+        line = self.peek().line
+        if self.match(TokenType.IF): stmt = self.if_statement()
+        elif self.match(TokenType.FOR): stmt = self.for_statement()
+        elif self.match(TokenType.PRINT): stmt = self.print_statement()
+        elif self.match(TokenType.WHILE): stmt = self.while_statement()
+        elif self.match(TokenType.RETURN): stmt = self.return_statement()
+        elif self.match(TokenType.LEFT_BRACE): stmt = Block(self.block_statement())
+        else: stmt = self.expression_statement()
+
+        stmt.line = line
+        return stmt
 
     def if_statement(self):
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after if.")
@@ -78,14 +87,17 @@ class Parser:
         return If(condition, then_branch, else_branch)
 
     def for_statement(self):
+        line = self.previous().line
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after for.")
         
         if self.match(TokenType.SEMICOLON):
             initializer = None
         elif self.match(TokenType.VAR):
             initializer = self.var_declaration()
+            initializer.line = line
         else:
             initializer = self.expression_statement()
+            initializer.line = line
 
         condition = Literal(True)
         if not self.check(TokenType.SEMICOLON):
@@ -94,7 +106,7 @@ class Parser:
         self.consume(TokenType.SEMICOLON, "Expect ';' after for condition.")
 
         increment = None
-        if not self.check(TokenType.SEMICOLON):
+        if not self.check(TokenType.RIGHT_PAREN):
             increment = self.expression()
 
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
@@ -102,12 +114,17 @@ class Parser:
         body = self.statement()
 
         if increment is not None:
+            increment = Expression(increment)
+            increment.line = line
+
             body = Block(statements=[
                 body,
                 increment
             ])
+            body.line = line
 
         body = While(condition, body)
+        body.line = line
 
         if initializer is not None:
             body = Block(statements=[
@@ -123,6 +140,15 @@ class Parser:
         self.consume(TokenType.SEMICOLON, "Expect ';' after value.")
         return Print(value)
 
+    def return_statement(self):
+        keyword = self.previous()
+        value = None
+        if not self.check(TokenType.SEMICOLON):
+            value = self.expression()
+
+        self.consume(TokenType.SEMICOLON, "Expect ';' after return value.")
+        return Return(keyword, value)
+
     def while_statement(self):
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after while.")
         condition = self.expression()
@@ -182,7 +208,7 @@ class Parser:
             if isinstance(expr, Variable):
                 return Assign(expr.name, value)
             
-            Error.error(equals, "Invalid assignment target.")
+            self.errors.error(equals, "Invalid assignment target.")
 
         return expr
 
@@ -194,7 +220,7 @@ class Parser:
             right = self.logical_and()
 
             if right is None:
-                Error.error(operator, f"Expect expression after or, got <{right}>.")
+                self.errors.error(operator, f"Expect expression after or, got <{right}>.")
             expr = Logical(expr, operator, right)
 
         return expr
@@ -295,7 +321,9 @@ class Parser:
             expr = self.expression()
             self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
             return Grouping(expr)
-        
+
+        raise self.error(self.peek(), "Expect expression.")
+
     def consume(self, type_, message):
         if self.check(type_): return self.advance()
         raise self.error(self.previous(), message)
@@ -325,9 +353,35 @@ class Parser:
         return self.peek().type == TokenType.EOF
 
     def error(self, token, message):
-        Error.token_error(token, message)
+        self.errors.token_error(token, message)
         return ParseError()
 
 
+class StreamingParser(Parser):
+    """
+    Parser pulling tokens lazily from an iterator.
+
+    Only the current and the previous token are kept, which is all the
+    lookahead the grammar needs.
+    """
+    def __init__(self, tokens: Iterator[Token], errors=Error):
+        self.errors = errors
+        self.tokens = tokens
+        self.previous_token: Token = None
+        self.next_token: Token = next(tokens)
+
+    def advance(self):
+        if not self.is_at_end():
+            self.previous_token = self.next_token
+            self.next_token = next(self.tokens)
+        return self.previous()
+
+    def previous(self):
+        return self.previous_token
+
+    def peek(self):
+        return self.next_token
+
+
 class ParseError(RuntimeError):
     pass
\ No newline at end of file
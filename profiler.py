@@ -0,0 +1,262 @@
+from interpreter import Interpreter
+from lox_callable import LoxFunction
+from stmt import Stmt
+from typing import Dict, List, TextIO
+from collections import Counter
+import sys
+import threading
+import time
+
+
+class FunctionProfile:
+    __slots__ = ("name", "calls", "inclusive", "exclusive", "active")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.inclusive = 0
+        self.exclusive = 0
+        # Recursive activations currently running; only the outermost adds to inclusive time.
+        self.active = 0
+
+
+class Frame:
+    __slots__ = ("profile", "stack", "start", "children")
+
+    def __init__(self, profile: FunctionProfile, stack: str, start: int):
+        self.profile = profile
+        self.stack = stack
+        self.start = start
+        self.children = 0
+
+
+class Profiler:
+    """
+    Deterministic profiler for the tree walking interpreter.
+
+    attach() shadows execute() on one Interpreter instance and replaces
+    LoxFunction.call until detach(), so programs run without profiling pay
+    nothing. Every statement executed is counted against its source line, and
+    every Lox function call against its declaration, with inclusive and
+    exclusive time. Exclusive time is also collected per call stack, written
+    in the collapsed format flamegraph.pl and speedscope read.
+    """
+    SCRIPT = "<script>"
+
+    def __init__(self, stacks_path: str = None):
+        self.stacks_path = stacks_path
+        self.functions: Dict[str, FunctionProfile] = dict()
+        self.lines: Counter = Counter()
+        self.stacks: Counter = Counter()
+        self.frames: List[Frame] = []
+        self.interpreter = None
+        self.original_execute = None
+        self.original_call = None
+
+    def attach(self, interpreter):
+        self.interpreter = interpreter
+        self.original_execute = interpreter.execute
+        interpreter.execute = self.execute
+
+        profiler = self
+        self.original_call = LoxFunction.call
+
+        def call(function, interpreter, arguments):
+            return profiler.call(function, interpreter, arguments)
+        LoxFunction.call = call
+        # Tail calls are made by the loop in the original call, without going through the one above.
+        interpreter.tail_call_hook = self.tail_call
+
+        self.enter(self.SCRIPT)
+
+    def detach(self):
+        if self.interpreter is None:
+            return
+
+        while self.frames:
+            self.leave()
+
+        LoxFunction.call = self.original_call
+        del self.interpreter.execute
+        self.interpreter.tail_call_hook = None
+        self.interpreter = None
+
+    def execute(self, stmt: Stmt):
+        if stmt.line is not None:
+            self.lines[stmt.line] += 1
+        return self.original_execute(stmt)
+
+    def call(self, function: LoxFunction, interpreter, arguments: List):
+        self.enter(self.name(function))
+        try:
+            return self.original_call(function, interpreter, arguments)
+        finally:
+            self.leave()
+
+    def tail_call(self, function: LoxFunction):
+        # The function called takes over the frame of the one returning it, like it does the Python stack.
+        self.leave()
+        self.enter(self.name(function))
+
+    @staticmethod
+    def name(function: LoxFunction) -> str:
+        declaration = function.declaration
+        return f"{declaration.name.lexeme}:{declaration.line}"
+
+    def enter(self, name: str):
+        profile = self.functions.get(name)
+        if profile is None:
+            profile = self.functions[name] = FunctionProfile(name)
+
+        profile.calls += 1
+        profile.active += 1
+
+        stack = f"{self.frames[-1].stack};{name}" if self.frames else name
+        self.frames.append(Frame(profile, stack, time.perf_counter_ns()))
+
+    def leave(self):
+        frame = self.frames.pop()
+        elapsed = time.perf_counter_ns() - frame.start
+        exclusive = elapsed - frame.children
+
+        profile = frame.profile
+        profile.active -= 1
+        if profile.active == 0:
+            profile.inclusive += elapsed
+        profile.exclusive += exclusive
+
+        self.stacks[frame.stack] += exclusive
+        if self.frames:
+            self.frames[-1].children += elapsed
+
+    def finish(self, out: TextIO):
+        """Detaches the profiler, writes the report to out and the collapsed stacks to stacks_path, if any."""
+        self.detach()
+        self.report(out)
+
+        if self.stacks_path is not None:
+            with open(self.stacks_path, "w") as f:
+                self.write_stacks(f)
+
+    def report(self, out: TextIO, lines: int = 20):
+        functions = sorted(self.functions.values(), key=lambda profile: profile.exclusive, reverse=True)
+
+        out.write(f"{'function':24} {'calls':>10} {'inclusive ms':>14} {'exclusive ms':>14}\n")
+        for profile in functions:
+            out.write(f"{profile.name:24} {profile.calls:10d} "
+                      f"{profile.inclusive / 1e6:14.3f} {profile.exclusive / 1e6:14.3f}\n")
+
+        out.write(f"\n{'line':>6} {'executions':>12}\n")
+        for line, count in self.lines.most_common(lines):
+            out.write(f"{line:6d} {count:12d}\n")
+
+    def write_stacks(self, out: TextIO):
+        # One "outer;inner microseconds" line per distinct call stack.
+        for stack, nanoseconds in self.stacks.items():
+            if nanoseconds >= 1000:
+                out.write(f"{stack} {nanoseconds // 1000}\n")
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the tree walking interpreter.
+
+    A background thread wakes up every interval and inspects the Python stack
+    of the thread running the program: Interpreter.execute frames hold the
+    statement being executed and LoxFunction.call frames the Lox function
+    being called. Nothing is hooked, so the program runs at full speed
+    between samples and the cost is a stack walk per interval.
+    """
+    SCRIPT = Profiler.SCRIPT
+    EXECUTE = Interpreter.execute.__code__
+    CALL = LoxFunction.call.__code__
+
+    def __init__(self, interval: float = 0.005, stacks_path: str = None):
+        self.interval = interval
+        self.stacks_path = stacks_path
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.lines: Counter = Counter()
+        self.thread_id = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def attach(self, interpreter):
+        if self.thread is not None:
+            return
+
+        self.thread_id = threading.get_ident()
+        self.thread = threading.Thread(target=self.run, name="lox-sampler", daemon=True)
+        self.thread.start()
+
+    def detach(self):
+        if self.thread is None:
+            return
+
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.sample(frame)
+
+    def sample(self, frame):
+        line = None
+        stack = []
+
+        while frame is not None:
+            code = frame.f_code
+            if code is self.EXECUTE:
+                # The innermost statement with a line.
+                if line is None:
+                    line = getattr(frame.f_locals.get("stmt"), "line", None)
+            elif code is self.CALL:
+                # Tail calls reuse the frame of the first call, running `function` instead of `self`.
+                locals_ = frame.f_locals
+                declaration = locals_.get("function", locals_["self"]).declaration
+                stack.append(f"{declaration.name.lexeme}:{declaration.line}")
+            frame = frame.f_back
+
+        stack.append(self.SCRIPT)
+        stack.reverse()
+
+        self.samples += 1
+        self.stacks[tuple(stack)] += 1
+        if line is not None:
+            self.lines[line] += 1
+
+    def finish(self, out: TextIO):
+        """Stops sampling, writes the report to out and the collapsed stacks to stacks_path, if any."""
+        self.detach()
+        self.report(out)
+
+        if self.stacks_path is not None:
+            with open(self.stacks_path, "w") as f:
+                self.write_stacks(f)
+
+    def report(self, out: TextIO, top: int = 20):
+        out.write(f"{self.samples} samples, one every {self.interval * 1000:g} ms\n")
+        if not self.samples:
+            return
+
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                total[name] += count
+
+        out.write(f"\n{'function':24} {'self %':>8} {'total %':>8}\n")
+        for name, count in own.most_common(top):
+            out.write(f"{name:24} {100 * count / self.samples:8.1f} {100 * total[name] / self.samples:8.1f}\n")
+
+        out.write(f"\n{'line':>6} {'samples %':>10}\n")
+        for line, count in self.lines.most_common(top):
+            out.write(f"{line:6d} {100 * count / self.samples:10.1f}\n")
+
+    def write_stacks(self, out: TextIO):
+        # One "outer;inner samples" line per distinct call stack.
+        for stack, count in self.stacks.items():
+            out.write(f"{';'.join(stack)} {count}\n")
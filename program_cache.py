@@ -0,0 +1,88 @@
+from stmt import Stmt
+from typing import List
+from contextlib import contextmanager
+import gc
+import hashlib
+import os
+import pickle
+import stat
+import sys
+import tempfile
+
+
+class ProgramCache:
+    """
+    Keeps the parsed statements of a script in __loxcache__/ next to it, the
+    way CPython keeps .pyc files, so unchanged scripts skip scanning and parsing.
+
+    A cache file starts with a header holding MAGIC, FORMAT_VERSION and the
+    sha256 of the source, followed by the pickled statements. Any mismatch or
+    unreadable file counts as a miss and the script is parsed again. Files are
+    written to a temporary name and renamed into place, so a concurrent run
+    never reads a partial file.
+    """
+    MAGIC = b"LOXC"
+    # Bump whenever the shape of a Stmt, Expr or Token changes.
+    FORMAT_VERSION = 5
+    DIRECTORY = "__loxcache__"
+
+    @staticmethod
+    def path(source_path: str) -> str:
+        # The whole name, extension included, so foo.lox and foo.txt keep separate caches.
+        directory, name = os.path.split(os.path.abspath(source_path))
+        return os.path.join(directory, ProgramCache.DIRECTORY, f"{name}.{sys.implementation.cache_tag}.loxc")
+
+    @staticmethod
+    def header(source: str) -> bytes:
+        digest = hashlib.sha256(source.encode("utf-8", "surrogatepass")).digest()
+        return ProgramCache.MAGIC + ProgramCache.FORMAT_VERSION.to_bytes(4, "little") + digest
+
+    @staticmethod
+    @contextmanager
+    def collector_paused():
+        # Pickling a tree allocates hundreds of thousands of objects; collecting while doing so more than doubles the time.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            yield
+        finally:
+            if enabled: gc.enable()
+
+    @staticmethod
+    def load(source_path: str, source: str) -> List[Stmt] | None:
+        header = ProgramCache.header(source)
+
+        try:
+            with open(ProgramCache.path(source_path), "rb") as f:
+                if f.read(len(header)) != header:
+                    return None
+                with ProgramCache.collector_paused():
+                    return pickle.load(f)
+        except Exception:
+            return None
+
+    @staticmethod
+    def store(source_path: str, source: str, statements: List[Stmt]):
+        path = ProgramCache.path(source_path)
+        directory = os.path.dirname(path)
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # Like .pyc files, the cache is readable by whoever can read the source.
+                os.chmod(temporary, stat.S_IMODE(os.stat(source_path).st_mode) | stat.S_IWUSR)
+                f.write(ProgramCache.header(source))
+                with ProgramCache.collector_paused():
+                    pickle.dump(statements, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except (OSError, pickle.PicklingError, RecursionError):
+            # Caching is best effort; the program still runs from the parsed tree.
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
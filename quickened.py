@@ -0,0 +1,167 @@
+from expr import Binary, Logical, Unary
+from lox_token import TokenType
+import operator
+
+# Specialized versions of Binary, Unary and Logical nodes. The tree walking
+# interpreter evaluates a node generically the first time, then assigns its
+# __class__ to the variant for the operator and the operand types it saw, so
+# later evaluations skip the operator dispatch and the type checks. Variants
+# for numbers guard on float operands; when the guard fails the node falls
+# back to a Generic variant for good. Every variant keeps the fields of the
+# node it specializes, and ExprVisitor sends visitors that do not know the
+# variants to the visit method of that node.
+
+
+class NumberBinary(Binary):
+    """Arithmetic or comparison that has only seen numbers, applying operation while both operands still are."""
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_binary_expr(self)
+
+
+class NumberAdd(NumberBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.add)
+
+
+class NumberSubtract(NumberBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.sub)
+
+
+class NumberMultiply(NumberBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.mul)
+
+
+class NumberDivide(NumberBinary):
+    __slots__ = ()
+    # Division by zero raises ZeroDivisionError, which the interpreter reports like the generic node.
+    operation = staticmethod(operator.truediv)
+
+
+class NumberLess(NumberBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.lt)
+
+
+class NumberLessEqual(NumberBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.le)
+
+
+class NumberGreater(NumberBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.gt)
+
+
+class NumberGreaterEqual(NumberBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.ge)
+
+
+class PlainBinary(Binary):
+    """Operator that accepts operands of any type, so it needs no guard."""
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_plain_binary_expr(self)
+
+
+class Equal(PlainBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.eq)
+
+
+class NotEqual(PlainBinary):
+    __slots__ = ()
+    operation = staticmethod(operator.ne)
+
+
+class Comma(PlainBinary):
+    __slots__ = ()
+    operation = staticmethod(lambda left, right: right)
+
+
+class GenericBinary(Binary):
+    """Binary that has seen operands no variant covers."""
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_generic_binary_expr(self)
+
+
+class NumberNegate(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_number_negate_expr(self)
+
+
+class Not(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_not_expr(self)
+
+
+class GenericUnary(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_generic_unary_expr(self)
+
+
+class Or(Logical):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_or_expr(self)
+
+
+class And(Logical):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visit_and_expr(self)
+
+
+NUMBER_BINARY = {
+    TokenType.PLUS: NumberAdd,
+    TokenType.MINUS: NumberSubtract,
+    TokenType.STAR: NumberMultiply,
+    TokenType.SLASH: NumberDivide,
+    TokenType.LESS: NumberLess,
+    TokenType.LESS_EQUAL: NumberLessEqual,
+    TokenType.GREATER: NumberGreater,
+    TokenType.GREATER_EQUAL: NumberGreaterEqual,
+}
+
+PLAIN_BINARY = {
+    TokenType.EQUAL_EQUAL: Equal,
+    TokenType.BANG_EQUAL: NotEqual,
+    TokenType.COMMA: Comma,
+}
+
+
+def quicken_binary(expr: Binary, left, right):
+    cls = PLAIN_BINARY.get(expr.operator.type)
+    if cls is None:
+        cls = GenericBinary
+        if type(left) is float and type(right) is float:
+            cls = NUMBER_BINARY.get(expr.operator.type, GenericBinary)
+    expr.__class__ = cls
+
+
+def quicken_unary(expr: Unary, right):
+    if expr.operator.type == TokenType.BANG:
+        expr.__class__ = Not
+    elif expr.operator.type == TokenType.MINUS and type(right) is float:
+        expr.__class__ = NumberNegate
+    else:
+        expr.__class__ = GenericUnary
+
+
+def quicken_logical(expr: Logical):
+    expr.__class__ = Or if expr.operator.type == TokenType.OR else And
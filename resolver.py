@@ -0,0 +1,164 @@
+from expr import *
+from stmt import *
+from errors import Error
+from typing import Dict, List
+
+
+class Frame:
+    """Slots of one environment, a function's or a top level block's, shared by the blocks nested in it."""
+    def __init__(self):
+        # Slots in use by the scopes open so far, and the most ever in use at once.
+        self.used = 0
+        self.size = 0
+
+
+class Scope:
+    def __init__(self, frame: Frame):
+        self.frame = frame
+        self.slots: Dict[str, int] = dict()
+
+    def declare(self, name: str, fresh=False) -> int:
+        if not fresh and name in self.slots:
+            return self.slots[name]
+
+        frame = self.frame
+        slot = frame.used
+        self.slots[name] = slot
+        frame.used += 1
+        frame.size = max(frame.size, frame.used)
+        return slot
+
+
+class Resolver(StmtVisitor, ExprVisitor):
+    """
+    Static pass run between parsing and interpretation.
+
+    Every local variable access is annotated with the number of environments
+    to hop (depth) and its index in that environment (slot). Anything that
+    does not resolve to a local is left as a global and looked up by name.
+    Functions do not capture their enclosing scopes, so a function body only
+    sees its own locals and the globals.
+
+    Since nothing can capture a block's variables either, blocks nested in a
+    function or in a top level block get no environment of their own: their
+    variables take further slots of the enclosing one, which sibling blocks
+    reuse, and their size is None. Locals are therefore always at depth 0,
+    which the engines rely on, and a loop body allocates nothing per iteration.
+    """
+    def __init__(self, errors=Error):
+        self.errors = errors
+        self.scopes: List[Scope] = []
+        self.in_function = False
+        self.pending: List[Expr] = []
+
+    def resolve(self, statements: List[Stmt]):
+        for statement in statements:
+            statement.accept(self)
+
+    def visit_expression_stmt(self, stmt: Expression):
+        self.resolve_expression(stmt.expression)
+
+    def visit_function_stmt(self, stmt: Function):
+        stmt.slot = self.declare(stmt.name)
+
+        enclosing, enclosing_function = self.scopes, self.in_function
+        self.scopes = [Scope(Frame())]
+        self.in_function = True
+
+        for parameter in stmt.parameters:
+            self.scopes[-1].declare(parameter.lexeme, fresh=True)
+
+        self.resolve(stmt.body)
+        stmt.size = self.scopes[-1].frame.size
+
+        self.scopes, self.in_function = enclosing, enclosing_function
+
+    def visit_if_stmt(self, stmt: If):
+        self.resolve_expression(stmt.condition)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.resolve_expression(stmt.expression)
+
+    def visit_block_stmt(self, stmt: Block):
+        frame = self.scopes[-1].frame if self.scopes else Frame()
+        used = frame.used
+
+        self.scopes.append(Scope(frame))
+        self.resolve(stmt.statements)
+        self.scopes.pop()
+        # The slots of this block are free again for the statements after it.
+        frame.used = used
+
+        # Only a top level block that declares something needs an environment.
+        stmt.size = frame.size if len(self.scopes) == 0 and frame.size else None
+
+    def visit_declaration_stmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            self.resolve_expression(stmt.initializer)
+
+        stmt.slot = self.declare(stmt.name)
+
+    def visit_while_stmt(self, stmt: While):
+        self.resolve_expression(stmt.condition)
+        stmt.body.accept(self)
+
+    def visit_return_stmt(self, stmt: Return):
+        if not self.in_function:
+            self.errors.token_error(stmt.keyword, "Can't return from top-level code.")
+
+        if stmt.value is not None:
+            self.resolve_expression(stmt.value)
+
+    def visit_conditional_expr(self, expr: Conditional):
+        self.pending.extend((expr.else_branch, expr.then_branch, expr.condition))
+
+    def visit_binary_expr(self, expr: Binary):
+        self.pending.extend((expr.right, expr.left))
+
+    def visit_call_expr(self, expr: Call):
+        self.pending.extend(reversed(expr.arguments))
+        self.pending.append(expr.callee)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.pending.append(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+    def visit_logical_expr(self, expr: Logical):
+        self.pending.extend((expr.right, expr.left))
+
+    def visit_unary_expr(self, expr: Unary):
+        self.pending.append(expr.right)
+
+    def visit_variable_expr(self, expr: Variable):
+        expr.depth, expr.slot = self.lookup(expr.name)
+
+    def visit_assign_expr(self, expr: Assign):
+        self.pending.append(expr.value)
+        expr.depth, expr.slot = self.lookup(expr.name)
+
+    def resolve_expression(self, expr: Expr):
+        # Expressions are walked with an explicit stack, so operator chains
+        # longer than Python's recursion limit still resolve. Each visit
+        # annotates its node and leaves its operands in `pending`.
+        self.pending.append(expr)
+        while self.pending:
+            self.pending.pop().accept(self)
+
+    def declare(self, name: Token):
+        if not self.scopes:
+            return None
+        return self.scopes[-1].declare(name.lexeme)
+
+    def lookup(self, name: Token):
+        # Every open scope shares one frame, so a local is always in the current environment.
+        for scope in reversed(self.scopes):
+            slot = scope.slots.get(name.lexeme)
+            if slot is not None:
+                return 0, slot
+
+        return None, None
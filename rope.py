@@ -0,0 +1,62 @@
+from typing import List
+
+
+class Rope:
+    """
+    String made by concatenation, joined only when it is observed.
+
+    Ropes share their list of parts: appending to the rope that owns the
+    end of the list appends in place, so building a string piece by piece
+    in a loop costs linear time instead of copying the string every time.
+    Everything that looks at the text (print, stringify, equality, natives)
+    goes through __str__, __eq__ or __bool__, so Lox never sees a
+    difference from str.
+    """
+    __slots__ = ("parts", "count", "length", "flat")
+
+    # Shorter strings are concatenated right away; copying them costs less than a rope.
+    MIN_LENGTH = 256
+
+    def __init__(self, parts: List[str], length: int):
+        self.parts = parts
+        # Only the first count parts belong to this rope; later ones were appended by longer ropes.
+        self.count = len(parts)
+        self.length = length
+        self.flat = None
+
+    @staticmethod
+    def concat(left, right):
+        """left + right for Lox, where either operand is a str or a Rope and the other is converted with str()."""
+        right = right if type(right) is str else str(right)
+
+        if type(left) is Rope:
+            parts = left.parts
+            if left.count != len(parts):
+                # Another rope already appended to these parts.
+                parts = parts[:left.count]
+            parts.append(right)
+            return Rope(parts, left.length + len(right))
+
+        left = left if type(left) is str else str(left)
+        if len(left) < Rope.MIN_LENGTH:
+            return left + right
+        return Rope([left, right], len(left) + len(right))
+
+    def __str__(self):
+        if self.flat is None:
+            self.flat = "".join(self.parts[:self.count])
+        return self.flat
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __eq__(self, other):
+        if type(other) is Rope or type(other) is str:
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __bool__(self):
+        return self.length > 0
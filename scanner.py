@@ -1,9 +1,12 @@
 from lox_token import Token, TokenType
 from errors import Error
 from typing import List
+import re
+import sys
 
 class Scanner:
-    def __init__(self, source):
+    def __init__(self, source, errors=Error):
+        self.errors = errors
         self.start = 0
         self.current = 0
         self.line = 1
@@ -40,7 +43,7 @@ class Scanner:
     def scan_token(self):
         c = self.advance()
         match(c):
-            case x if x in [' ', '\r', '\t']: pass
+            case ' ' | '\r' | '\t': pass
             case '\n': self.line += 1
             case '(': self.add_token(TokenType.LEFT_PAREN)
             case ')': self.add_token(TokenType.RIGHT_PAREN)
@@ -69,7 +72,7 @@ class Scanner:
             case _:
                 if c.isnumeric(): self.number()
                 elif self.is_alpha(c): self.identifier()
-                else: Error.error(self.line, f'Unexpected character <{c}>')
+                else: self.errors.error(self.line, f'Unexpected character <{c}>')
 
     def identifier(self):
         while self.is_alphanumeric(self.peek()): self.advance()
@@ -94,7 +97,7 @@ class Scanner:
             self.advance()
 
         if self.is_at_end(): 
-            Error.error(self.line, "Unterminated string.")
+            self.errors.error(self.line, "Unterminated string.")
             return
         
         self.advance()
@@ -120,7 +123,7 @@ class Scanner:
             self.advance()
 
         if self.is_at_end() and count > 0: 
-            Error.error(self.line, "Unterminated multi-line comment.")
+            self.errors.error(self.line, "Unterminated multi-line comment.")
 
     def match(self, expected):
         if self.is_at_end(): return False
@@ -154,6 +157,159 @@ class Scanner:
 
     def add_token_(self, token_type, literal):
         text = self.source[self.start:self.current]
+        # Names and operators repeat throughout a program, so every token shares one copy of each lexeme.
+        if literal is None: text = sys.intern(text)
         self.tokens.append(Token(token_type, text, literal, self.line))
 
-    
\ No newline at end of file
+
+class FastScanner(Scanner):
+    """
+    Scanner that consumes a whole lexeme per step with one compiled regex.
+
+    Whitespace runs and comments are skipped in one match and their newlines
+    counted in bulk. Anything the pattern does not handle exactly like
+    Scanner, such as nested block comments, unterminated strings, stray
+    characters and non ASCII text, is handed to Scanner.scan_token for that
+    one lexeme, so both produce the same tokens and errors.
+    """
+    PATTERN = re.compile(r"""
+        (?P<space>(?:[ \t\r\n]+|//[^\n]*|/\*(?:(?!/\*|\*/).)*\*/)+)
+      | (?P<identifier>[A-Za-z_][A-Za-z_0-9]*(?![A-Za-z_0-9\x80-\U0010ffff]))
+      | (?P<number>[0-9]+(?:\.[0-9]+(?![0-9\x80-\U0010ffff])|(?![0-9\x80-\U0010ffff]|\.[0-9\x80-\U0010ffff])))
+      | (?P<string>"[^"]*")
+      | (?P<operator>!=|==|<=|>=|[(){}+\-*:;,.?!=<>]|/(?![*/]))
+      | (?P<other>.)
+    """, re.VERBOSE | re.DOTALL)
+
+    OPERATORS = {
+        "(": TokenType.LEFT_PAREN,
+        ")": TokenType.RIGHT_PAREN,
+        "{": TokenType.LEFT_BRACE,
+        "}": TokenType.RIGHT_BRACE,
+        "+": TokenType.PLUS,
+        "-": TokenType.MINUS,
+        "*": TokenType.STAR,
+        ":": TokenType.COLON,
+        ";": TokenType.SEMICOLON,
+        ",": TokenType.COMMA,
+        ".": TokenType.DOT,
+        "?": TokenType.QUESTION,
+        "!": TokenType.BANG,
+        "!=": TokenType.BANG_EQUAL,
+        "=": TokenType.EQUAL,
+        "==": TokenType.EQUAL_EQUAL,
+        "<": TokenType.LESS,
+        "<=": TokenType.LESS_EQUAL,
+        ">": TokenType.GREATER,
+        ">=": TokenType.GREATER_EQUAL,
+        "/": TokenType.SLASH,
+    }
+
+    def scan_tokens(self):
+        self.tokens = list(self.scan_stream())
+        return self.tokens
+
+    def scan_stream(self):
+        """Yields tokens one at a time, pulling more source through fill() when needed."""
+        keywords = self.keywords
+        operators = self.OPERATORS
+        identifier = TokenType.IDENTIFIER
+        number = TokenType.NUMBER
+        string = TokenType.STRING
+        intern = sys.intern
+        position = 0
+
+        while True:
+            source = self.source
+            # Lexemes too close to the end of a partial buffer may continue in the next chunk.
+            limit = len(source) if self.at_eof() else len(source) - 2
+            starved = True
+
+            for m in self.PATTERN.finditer(source, position):
+                if m.end() > limit:
+                    position = m.start()
+                    break
+
+                kind = m.lastgroup
+
+                if kind == "identifier":
+                    text = intern(m.group())
+                    yield Token(keywords.get(text, identifier), text, None, self.line)
+                elif kind == "space":
+                    self.line += m.group().count("\n")
+                elif kind == "operator":
+                    text = intern(m.group())
+                    yield Token(operators[text], text, None, self.line)
+                elif kind == "number":
+                    text = m.group()
+                    yield Token(number, text, float(text), self.line)
+                elif kind == "string":
+                    text = m.group()
+                    self.line += text.count("\n")
+                    yield Token(string, text, text[1:-1], self.line)
+                else:
+                    self.start = self.current = m.start()
+                    self.scan_token()
+                    if self.tokens:
+                        yield self.tokens.pop()
+                    position = self.current
+                    starved = False
+                    break
+            else:
+                position = len(source)
+
+            if position >= len(self.source) and self.at_eof():
+                break
+
+            if starved:
+                self.start = self.current = position
+                self.fill()
+                position = self.current
+
+        self.current = position
+        yield Token(TokenType.EOF, '', None, self.line)
+
+    def at_eof(self) -> bool:
+        return True
+
+    def fill(self) -> bool:
+        return False
+
+
+class StreamingScanner(FastScanner):
+    """
+    FastScanner over a file object that is read in fixed size chunks.
+
+    Only the unscanned tail of the input is kept in memory; source already
+    turned into tokens is dropped each time a new chunk is read.
+    """
+    def __init__(self, stream, chunk_size: int = 1 << 16, errors=Error):
+        super().__init__("", errors)
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.eof = False
+
+    def at_eof(self) -> bool:
+        return self.eof
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.source = self.source[self.start:] + chunk
+        self.current -= self.start
+        self.start = 0
+        return True
+
+    def is_at_end(self):
+        return self.current >= len(self.source) and not self.fill()
+
+    def peek_next(self):
+        if self.current + 1 >= len(self.source):
+            self.fill()
+        return super().peek_next()
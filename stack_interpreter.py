@@ -0,0 +1,406 @@
+from expr import *
+from stmt import *
+from environment import Environment
+from lox_token import TokenType
+from interpreter import Interpreter
+from lox_callable import LoxCallable, LoxFunction
+from errors import LoxRuntimeError
+from typing import List
+import math
+
+# Tags of the continuations pushed on the work stack between the nodes.
+POP, PRINT, DEFINE, IF, WHILE, EXIT_BLOCK, CALLEE, CALL, TAIL, RETURN, END_FUNCTION, \
+    BINARY, LOGICAL, CONDITIONAL, UNARY, ASSIGN = range(16)
+
+END = (END_FUNCTION,)
+POP_VALUE = (POP,)
+PRINT_VALUE = (PRINT,)
+RETURN_VALUE = (RETURN,)
+
+# Call free expressions up to this height are evaluated by the recursive visitors of Interpreter.
+FLAT = 32
+
+
+class Heights(dict):
+    """
+    Height of each expression, filled in on first lookup. Anything holding a
+    call counts as infinitely high, since a call may recurse without bound.
+    """
+    def __missing__(self, expr: Expr) -> float:
+        pending = [expr]
+
+        while pending:
+            node = pending[-1]
+            if node in self:
+                pending.pop()
+                continue
+
+            cls = type(node)
+            if cls is Call:
+                self[node] = float("inf")
+                pending.pop()
+                continue
+
+            # Subclasses too: nodes the inherited visitors evaluate specialize themselves, see quickened.py.
+            if issubclass(cls, (Binary, Logical)):
+                children = (node.left, node.right)
+            elif issubclass(cls, Unary):
+                children = (node.right,)
+            elif cls is Grouping:
+                children = (node.expression,)
+            elif cls is Assign:
+                children = (node.value,)
+            elif cls is Conditional:
+                children = (node.condition, node.then_branch, node.else_branch)
+            else:
+                children = ()
+
+            unknown = [child for child in children if child not in self]
+            if unknown:
+                pending.extend(unknown)
+                continue
+
+            pending.pop()
+            self[node] = 1 + max((self[child] for child in children), default=0)
+
+        return self[expr]
+
+
+class DirectCalls(dict):
+    """Whether the callee and every argument of a call can be evaluated recursively, filled in on first lookup."""
+    def __init__(self, heights: Heights):
+        super().__init__()
+        self.heights = heights
+
+    def __missing__(self, expr: Call) -> bool:
+        heights = self.heights
+        direct = self[expr] = heights[expr.callee] <= FLAT and all(heights[argument] <= FLAT for argument in expr.arguments)
+        return direct
+
+
+
+
+class StackInterpreter(Interpreter):
+    """
+    Tree walking interpreter that keeps its own work and value stacks
+    instead of recursing through execute() and the call visitor.
+
+    Statements still to run and continuations, tuples tagged with what to do
+    once the values of a node are known, share the work stack; evaluated
+    values go on the value stack. A Lox call pushes a frame holding the
+    caller's environment and the height of the work stack, so a return drops
+    the rest of the body in one slice. Only expressions without calls and no
+    higher than FLAT go through the inherited recursive visitors, so nesting,
+    whether calls, blocks or operator chains, is bounded by memory instead of
+    Python's recursion limit.
+
+    Since the whole state lives on those stacks, run() can also stop after a
+    number of steps, loop iterations and calls, and carry on where it left
+    off when called again.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.work: List = []
+        self.values: List = []
+        self.frames: List = []
+        self.heights = Heights()
+        self.direct = DirectCalls(self.heights)
+        # Line of the loop or call where run() last ran out of steps.
+        self.paused_line = None
+
+    def interpret(self, statements: List[Stmt]):
+        try:
+            self.start(statements)
+            self.run()
+        except LoxRuntimeError as e:
+            self.errors.runtime_error(e)
+            self.reset()
+
+    def start(self, statements: List[Stmt]):
+        self.work.extend(reversed(statements))
+
+    def reset(self):
+        self.work.clear()
+        self.values.clear()
+        self.frames.clear()
+        self.environment = self.globals
+
+    def run(self, max_steps: float = math.inf) -> bool:
+        """
+        Runs until the work stack is empty and returns True, or returns False
+        once max_steps loop iterations and calls have started. Bounding only
+        those bounds the statements run too, since nothing else repeats.
+        """
+        steps = max_steps
+        work, values, frames, heights, direct = self.work, self.values, self.frames, self.heights, self.direct
+        pop, push = work.pop, work.append
+        binary, is_truthy, write = self.binary, self.is_truthy, self.output.write
+        free = self.free_environments
+        # Mirrors self.environment, which the recursive visitors read.
+        environment = self.environment
+        # Set by the branches below when a call is ready to be made, together with arguments, tail and site.
+        callee = None
+
+        while work:
+            item = pop()
+            cls = type(item)
+
+            if cls is tuple:
+                tag = item[0]
+
+                if tag == BINARY:
+                    right = values.pop()
+                    values[-1] = binary(item[1], values[-1], right)
+
+                elif tag == CALL or tag == TAIL:
+                    expr = item[1]
+                    count = len(expr.arguments)
+                    start = len(values) - count
+                    callee = values[start - 1]
+                    arguments = values[start:]
+                    tail = tag == TAIL
+                    del values[start - 1:]
+
+                    if count != callee.arity():
+                        raise LoxRuntimeError(expr.paren, f"Expected {callee.arity()} args but got {count}.")
+                    site = expr
+
+                elif tag == CALLEE:
+                    expr = item[1]
+                    if not isinstance(values[-1], LoxCallable):
+                        raise LoxRuntimeError(expr.paren, "Can only call functions and classes")
+                    push((item[2], expr))
+                    work.extend(reversed(expr.arguments))
+
+                elif tag == END_FUNCTION:
+                    environment.values = None
+                    free.append(environment)
+                    environment = self.environment = frames.pop()[0]
+                    values.append(None)
+
+                elif tag == RETURN:
+                    environment.values = None
+                    free.append(environment)
+                    environment, height = frames.pop()
+                    self.environment = environment
+                    del work[height:]
+
+                elif tag == EXIT_BLOCK:
+                    environment = self.environment = item[1]
+
+                elif tag == WHILE:
+                    if is_truthy(values.pop()):
+                        stmt = item[1]
+                        push(item)
+                        push(stmt.condition)
+                        push(stmt.body)
+                        steps -= 1
+                        if not steps:
+                            self.paused_line = stmt.line
+                            return False
+
+                elif tag == IF:
+                    stmt = item[1]
+                    if is_truthy(values.pop()):
+                        push(stmt.then_branch)
+                    elif stmt.else_branch is not None:
+                        push(stmt.else_branch)
+
+                elif tag == POP:
+                    values.pop()
+
+                elif tag == DEFINE:
+                    self.define(item[1].name, item[1].slot, values.pop())
+
+                elif tag == PRINT:
+                    write(self.stringify(values.pop()) + "\n")
+
+                elif tag == ASSIGN:
+                    expr = item[1]
+                    if expr.depth is None:
+                        self.globals.assign(expr.name, values[-1])
+                    else:
+                        environment.values[expr.slot] = values[-1]
+
+                elif tag == LOGICAL:
+                    expr = item[1]
+                    left = is_truthy(values.pop())
+                    if expr.operator.type == TokenType.OR and left:
+                        values.append(True)
+                    elif expr.operator.type == TokenType.AND and not left:
+                        values.append(False)
+                    else:
+                        push(expr.right)
+
+                elif tag == CONDITIONAL:
+                    expr = item[1]
+                    push(expr.then_branch if is_truthy(values.pop()) else expr.else_branch)
+
+                elif tag == UNARY:
+                    values[-1] = self.unary(item[1], values[-1])
+
+            elif cls is Expression:
+                expr = item.expression
+                if heights[expr] <= FLAT:
+                    expr.accept(self)
+                else:
+                    push(POP_VALUE)
+                    push(expr)
+
+            elif cls is If:
+                condition = item.condition
+                if heights[condition] <= FLAT:
+                    if is_truthy(condition.accept(self)):
+                        push(item.then_branch)
+                    elif item.else_branch is not None:
+                        push(item.else_branch)
+                else:
+                    push((IF, item))
+                    push(condition)
+
+            elif cls is Return:
+                value = item.value
+                if type(value) is Call:
+                    if direct[value]:
+                        callee, arguments = self.evaluate_call(value)
+                        tail, site = True, value
+                    else:
+                        push((CALLEE, value, TAIL))
+                        push(value.callee)
+                elif value is None or heights[value] <= FLAT:
+                    value = None if value is None else value.accept(self)
+                    environment.values = None
+                    free.append(environment)
+                    environment, height = frames.pop()
+                    self.environment = environment
+                    del work[height:]
+                    values.append(value)
+                else:
+                    push(RETURN_VALUE)
+                    push(value)
+
+            elif cls is Block:
+                if item.size is None:
+                    # Its variables live in the current environment, see Resolver.
+                    work.extend(reversed(item.statements))
+                else:
+                    push((EXIT_BLOCK, environment))
+                    work.extend(reversed(item.statements))
+                    environment = self.environment = Environment(item.size)
+
+            elif cls is Var:
+                initializer = item.initializer
+                if initializer is None:
+                    self.define(item.name, item.slot, None)
+                elif heights[initializer] <= FLAT:
+                    self.define(item.name, item.slot, initializer.accept(self))
+                else:
+                    push((DEFINE, item))
+                    push(initializer)
+
+            elif cls is While:
+                condition = item.condition
+                if heights[condition] <= FLAT:
+                    if is_truthy(condition.accept(self)):
+                        push(item)
+                        push(item.body)
+                        steps -= 1
+                        if not steps:
+                            self.paused_line = item.line
+                            return False
+                else:
+                    push((WHILE, item))
+                    push(condition)
+
+            elif cls is Print:
+                expr = item.expression
+                if heights[expr] <= FLAT:
+                    write(self.stringify(expr.accept(self)) + "\n")
+                else:
+                    push(PRINT_VALUE)
+                    push(expr)
+
+            elif cls is Function:
+                self.define(item.name, item.slot, LoxFunction(item))
+
+            elif cls is Variable:
+                if item.depth is None:
+                    values.append(item.cached if item.version == self.globals.version else self.visit_variable_expr(item))
+                else:
+                    values.append(environment.values[item.slot])
+
+            elif cls is Literal:
+                values.append(item.value)
+
+            elif cls is Call:
+                if direct[item]:
+                    callee, arguments = self.evaluate_call(item)
+                    tail, site = False, item
+                else:
+                    push((CALLEE, item, CALL))
+                    push(item.callee)
+
+            elif heights[item] <= FLAT:
+                values.append(item.accept(self))
+
+            elif cls is Binary:
+                push((BINARY, item.operator))
+                push(item.right)
+                push(item.left)
+
+            elif cls is Logical:
+                push((LOGICAL, item))
+                push(item.left)
+
+            elif cls is Assign:
+                push((ASSIGN, item))
+                push(item.value)
+
+            elif cls is Grouping:
+                push(item.expression)
+
+            elif cls is Conditional:
+                push((CONDITIONAL, item))
+                push(item.condition)
+
+            elif cls is Unary:
+                push((UNARY, item.operator))
+                push(item.right)
+
+            else:
+                raise NotImplementedError(f"Node <{cls.__name__}> not implemented.")
+
+            if callee is None:
+                continue
+
+            if type(callee) is LoxFunction:
+                if not tail:
+                    frames.append((environment, len(work)))
+                    push(END)
+                else:
+                    # A call in tail position takes over the frame of the function returning it.
+                    del work[frames[-1][1] + 1:]
+                    environment.values = None
+                    free.append(environment)
+
+                environment = self.environment = free.pop() if free else Environment()
+                environment.values = arguments + callee.locals
+                work.extend(reversed(callee.declaration.body))
+                steps -= 1
+                if not steps:
+                    self.paused_line = site.paren.line
+                    return False
+            elif not tail:
+                values.append(self.call_native(callee, arguments, site.paren))
+            else:
+                value = self.call_native(callee, arguments, site.paren)
+                environment.values = None
+                free.append(environment)
+                environment, height = frames.pop()
+                self.environment = environment
+                del work[height:]
+                values.append(value)
+
+            callee = None
+
+        return True
@@ -25,62 +25,104 @@ class StmtVisitor(ABC):
     @abstractmethod
     def visit_while_stmt(self, stmt): pass
 
+    @abstractmethod
+    def visit_return_stmt(self, stmt): pass
+
 
 class Stmt:
+    # Source line of the statement's first token, filled in by the Parser.
+    __slots__ = ("line",)
+
     def accept(self, visitor: StmtVisitor):
         pass
 
 class Expression(Stmt):
+    __slots__ = ("expression",)
+
     def __init__(self, expr: Expr):
         self.expression = expr
+        self.line = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_expression_stmt(self)
 
 class Function(Stmt):
+    __slots__ = ("name", "parameters", "body", "slot", "size")
+
     def __init__(self, name: Token, parameters: List[Token], body: List[Stmt]): 
         self.name = name
         self.parameters = parameters
         self.body = body
+        self.slot = None
+        self.size = 0
+        self.line = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_function_stmt(self)
 
 class If(Stmt):
+    __slots__ = ("condition", "then_branch", "else_branch")
+
     def __init__(self, condition: Expr, then_branch: Stmt, else_branch: Stmt = None):
         self.condition = condition
         self.then_branch = then_branch
         self.else_branch = else_branch
+        self.line = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_if_stmt(self)
 
 class Print(Stmt):
+    __slots__ = ("expression",)
+
     def __init__(self, expr: Expr):
         self.expression = expr
+        self.line = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_print_stmt(self)
 
 class Block(Stmt):
+    __slots__ = ("statements", "size")
+
     def __init__(self, statements: List[Stmt]):
         self.statements = statements
+        self.size = 0
+        self.line = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_block_stmt(self)
 
 class Var(Stmt):
+    __slots__ = ("name", "initializer", "slot")
+
     def __init__(self, name: Token, initializer: Expr):
         self.name = name
         self.initializer = initializer
+        self.slot = None
+        self.line = None
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_declaration_stmt(self)
 
 class While(Stmt):
+    __slots__ = ("condition", "body")
+
     def __init__(self, condition: Expr, body: Stmt):
         self.condition = condition
         self.body = body
+        self.line = None
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_while_stmt(self)
+
+class Return(Stmt):
+    __slots__ = ("keyword", "value")
+
+    def __init__(self, keyword: Token, value: Expr):
+        self.keyword = keyword
+        self.value = value
+        self.line = None
 
     def accept(self, visitor: StmtVisitor):
-        return visitor.visit_while_stmt(self)
\ No newline at end of file
+        return visitor.visit_return_stmt(self)
\ No newline at end of file
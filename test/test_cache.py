@@ -0,0 +1,132 @@
+"""
+Tests for ProgramCache and the lox command's use of it.
+
+    python -m pytest test    # or: python -m unittest discover test
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+TEST = os.path.dirname(os.path.abspath(__file__))
+LOX = os.path.join(TEST, "..", "lox")
+
+sys.path.insert(0, os.path.join(TEST, ".."))
+
+from lox_runtime import LoxRuntime
+from program_cache import ProgramCache
+from stmt import Print
+
+
+SOURCE = "print 1;\n"
+
+
+def parse(source: str):
+    return LoxRuntime().parse(source)
+
+
+def lox(*args):
+    return subprocess.run([sys.executable, LOX, *args], capture_output=True, text=True)
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.source_path = self.script("program.lox", SOURCE)
+
+    def script(self, name: str, source: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as f:
+            f.write(source)
+        return path
+
+
+class ProgramCacheTest(CacheTestCase):
+    def test_hit(self):
+        ProgramCache.store(self.source_path, SOURCE, parse(SOURCE))
+        statements = ProgramCache.load(self.source_path, SOURCE)
+        self.assertEqual(len(statements), 1)
+        self.assertIsInstance(statements[0], Print)
+        self.assertEqual(statements[0].expression.value, 1)
+
+    def test_miss_without_a_cache_file(self):
+        self.assertIsNone(ProgramCache.load(self.source_path, SOURCE))
+
+    def test_source_changed(self):
+        ProgramCache.store(self.source_path, SOURCE, parse(SOURCE))
+        self.assertIsNone(ProgramCache.load(self.source_path, "print 2;\n"))
+
+    def test_format_version_bumped(self):
+        ProgramCache.store(self.source_path, SOURCE, parse(SOURCE))
+        with mock.patch.object(ProgramCache, "FORMAT_VERSION", ProgramCache.FORMAT_VERSION + 1):
+            self.assertIsNone(ProgramCache.load(self.source_path, SOURCE))
+
+    def test_corrupt_file(self):
+        path = ProgramCache.path(self.source_path)
+        for name, contents in (
+            ("garbage", b"not a cache file"),
+            ("header only", ProgramCache.header(SOURCE)),
+            ("bad pickle", ProgramCache.header(SOURCE) + b"\x80\x05garbage"),
+        ):
+            with self.subTest(name):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(contents)
+                self.assertIsNone(ProgramCache.load(self.source_path, SOURCE))
+
+    def test_truncated_file(self):
+        ProgramCache.store(self.source_path, SOURCE, parse(SOURCE))
+        path = ProgramCache.path(self.source_path)
+        size = os.path.getsize(path)
+        header = len(ProgramCache.header(SOURCE))
+        for length in (header // 2, header + 1, size - 1):
+            with self.subTest(length=length):
+                with open(path, "r+b") as f:
+                    f.truncate(length)
+                self.assertIsNone(ProgramCache.load(self.source_path, SOURCE))
+
+    def test_same_name_with_another_extension(self):
+        other = self.script("program.txt", "print 2;\n")
+        self.assertNotEqual(ProgramCache.path(self.source_path), ProgramCache.path(other))
+
+        ProgramCache.store(self.source_path, SOURCE, parse(SOURCE))
+        ProgramCache.store(other, "print 2;\n", parse("print 2;\n"))
+        self.assertEqual(ProgramCache.load(self.source_path, SOURCE)[0].expression.value, 1)
+        self.assertEqual(ProgramCache.load(other, "print 2;\n")[0].expression.value, 2)
+
+
+class LoxCommandCacheTest(CacheTestCase):
+    def forge(self):
+        # A cache entry for SOURCE holding another program, so a run shows where its statements came from.
+        ProgramCache.store(self.source_path, SOURCE, parse("print \"cached\";"))
+
+    def test_run_stores_the_program(self):
+        result = lox(self.source_path)
+        self.assertEqual((result.returncode, result.stdout), (0, "1\n"))
+        self.assertIsNotNone(ProgramCache.load(self.source_path, SOURCE))
+
+    def test_run_loads_the_program(self):
+        self.forge()
+        result = lox(self.source_path)
+        self.assertEqual((result.returncode, result.stdout), (0, "cached\n"))
+
+    def test_no_cache(self):
+        result = lox("--no-cache", self.source_path)
+        self.assertEqual((result.returncode, result.stdout), (0, "1\n"))
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, ProgramCache.DIRECTORY)))
+
+        self.forge()
+        result = lox("--no-cache", self.source_path)
+        self.assertEqual((result.returncode, result.stdout), (0, "1\n"))
+
+    def test_syntax_error_is_not_stored(self):
+        path = self.script("bad.lox", "print (;\n")
+        self.assertEqual(lox(path).returncode, 65)
+        self.assertFalse(os.path.exists(ProgramCache.path(path)))
+
+
+if __name__ == "__main__":
+    unittest.main()
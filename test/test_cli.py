@@ -0,0 +1,173 @@
+"""
+Tests for the lox command.
+
+    python -m pytest test    # or: python -m unittest discover test
+"""
+import ast
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from output import Output
+
+LOX = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lox")
+
+
+def lox(*args, stderr=subprocess.PIPE):
+    return subprocess.run([sys.executable, LOX, *args], stdout=subprocess.PIPE, stderr=stderr, text=True)
+
+
+# Runs the lox command with stdout and stderr replaced by streams that log every write, in order.
+RECORD = """
+import os, runpy, sys
+
+class Recorder:
+    def __init__(self, name):
+        self.name = name
+    def write(self, text):
+        sys.__stdout__.write(repr((self.name, text)) + "\\n")
+        return len(text)
+    def flush(self):
+        pass
+    def isatty(self):
+        return False
+
+sys.stdout, sys.stderr = Recorder("out"), Recorder("err")
+sys.argv = sys.argv[1:]
+sys.path.insert(0, os.path.dirname(sys.argv[0]))
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def writes(*args):
+    """Runs lox, returning its writes to stdout and stderr as ("out" or "err", text) in the order they happened."""
+    result = subprocess.run([sys.executable, "-c", RECORD, LOX, *args], capture_output=True, text=True)
+    return [ast.literal_eval(line) for line in result.stdout.splitlines()]
+
+
+class LoxCommandTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def script(self, name: str, source: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as f:
+            f.write(source)
+        return path
+
+    def test_syntax_error_exits_with_65(self):
+        path = self.script("bad.lox", "print 1;\nprint (;\n")
+        for options in ([], ["--no-cache"]):
+            with self.subTest(options=options):
+                result = lox(*options, path)
+                self.assertEqual(result.returncode, 65)
+                self.assertIn("Expect expression.", result.stderr)
+                self.assertNotIn("Traceback", result.stderr)
+
+    def test_syntax_error_exits_with_65_when_streaming(self):
+        path = self.script("bad.lox", "print 1;\nprint (;\n")
+        result = lox("--stream", path)
+        # Declarations before the error have already run.
+        self.assertEqual(result.stdout, "1\n")
+        self.assertEqual(result.returncode, 65)
+        self.assertIn("Expect expression.", result.stderr)
+        self.assertNotIn("Traceback", result.stderr)
+
+    def test_syntax_error_in_batch(self):
+        bad = self.script("bad.lox", "print ;\n")
+        good = self.script("good.lox", "print 1;\n")
+        result = lox(bad, good)
+        self.assertEqual(result.returncode, 65)
+        self.assertEqual(result.stdout, "1\n")
+        self.assertIn(f"lox: {bad}: exit status 65", result.stderr)
+        self.assertNotIn("Traceback", result.stderr)
+
+    def test_stream_runs_like_a_whole_file(self):
+        # The programs test_programs checks, except those with a syntax error: declarations before it
+        # have already run when streaming.
+        for path in sorted(glob.glob(os.path.join(os.path.dirname(LOX), "test", "*.lox"))):
+            with open(path) as f:
+                if "// expect" not in f.read():
+                    continue
+            expected = lox("--no-cache", path)
+            if expected.returncode == 65:
+                continue
+            with self.subTest(program=os.path.basename(path)):
+                result = lox("--stream", path)
+                self.assertEqual((result.returncode, result.stdout, result.stderr),
+                                 (expected.returncode, expected.stdout, expected.stderr))
+
+    def test_memo_stats(self):
+        path = self.script("fib.lox", "fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }\nprint fib(20);\n")
+        result = lox("--memo-stats", path)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, "6765\n")
+        # One miss per argument from 0 to 20; fib(n - 2) hits for every n from 2 up.
+        self.assertRegex(result.stderr, r"\nfib +18 +21 +21\n")
+
+    def test_no_memoize(self):
+        path = self.script("fib.lox", "fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }\nprint fib(20);\n")
+        result = lox("--no-memoize", path)
+        self.assertEqual((result.returncode, result.stdout, result.stderr), (0, "6765\n", ""))
+
+        for options in (["--no-memoize", "--memo-stats"], ["--memo-stats", "--profile"], ["--memo-stats", "--sample"]):
+            with self.subTest(options=options):
+                result = lox(*options, path)
+                self.assertEqual(result.returncode, 64)
+                self.assertIn("mutually exclusive", result.stderr)
+
+    def test_profile_counts_every_call(self):
+        # fib is pure, so with memoization most of its recursive calls would be answered from the cache.
+        path = self.script("fib.lox", "fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }\nfib(15);\n")
+        result = lox("--profile", path)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertRegex(result.stderr, r"\nfib:1 +1973 ")
+
+    def test_profile_counts_tail_calls(self):
+        path = self.script("tail.lox",
+            "fun loop(n) { if (n == 0) return 0; return loop(n - 1); }\nloop(1000);\n"
+            "fun ping(n) { if (n == 0) return 0; return pong(n - 1); }\n"
+            "fun pong(n) { if (n == 0) return 0; return ping(n - 1); }\nping(5);\n")
+        result = lox("--profile", path)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertRegex(result.stderr, r"\nloop:1 +1001 ")
+        self.assertRegex(result.stderr, r"\nping:3 +3 ")
+        self.assertRegex(result.stderr, r"\npong:4 +3 ")
+
+    def test_flush_line(self):
+        path = self.script("print.lox", "print 1;\nprint 2;\nprint 3;\n")
+        self.assertEqual(writes("--flush", "line", path), [("out", "1\n"), ("out", "2\n"), ("out", "3\n")])
+
+    def test_flush_block(self):
+        # 1000 lines of 101 characters: one block once BLOCK_SIZE characters are waiting, the rest at exit.
+        path = self.script("print.lox", f"for (var i = 0; i < 1000; i = i + 1) print \"{'x' * 100}\";\n")
+        line = "x" * 100 + "\n"
+        block = -(-Output.BLOCK_SIZE // len(line))
+        self.assertEqual(writes("--flush", "block", path), [("out", line * block), ("out", line * (1000 - block))])
+
+    def test_flush_exit(self):
+        path = self.script("print.lox", f"for (var i = 0; i < 1000; i = i + 1) print \"{'x' * 100}\";\n")
+        self.assertEqual(writes("--flush", "exit", path), [("out", ("x" * 100 + "\n") * 1000)])
+
+    def test_output_is_flushed_before_a_runtime_error(self):
+        path = self.script("error.lox", "print 1;\nprint 2;\nprint missing;\nprint 3;\n")
+        error = "[line 3] Undefined variable 'missing'.\n"
+        for policy in Output.POLICIES:
+            with self.subTest(policy=policy):
+                recorded = writes("--flush", policy, path)
+                self.assertEqual("".join(text for stream, text in recorded if stream == "out"), "1\n2\n")
+                self.assertEqual(recorded[-1], ("err", error))
+
+                # Also through one pipe for both, the way a terminal or a log file sees them.
+                result = lox("--flush", policy, path, stderr=subprocess.STDOUT)
+                self.assertEqual((result.returncode, result.stdout), (70, "1\n2\n" + error))
+
+
+if __name__ == "__main__":
+    unittest.main()
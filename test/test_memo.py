@@ -0,0 +1,108 @@
+"""
+Tests for memoizing pure functions on the tree engine.
+
+    python -m pytest test    # or: python -m unittest discover test
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lox_runtime import LoxRuntime
+from memo import FunctionMemo, Memoizer
+
+
+class MemoizerTest(unittest.TestCase):
+    def run_lox(self, source: str, memoizer: Memoizer = None) -> LoxRuntime:
+        runtime = LoxRuntime()
+        if memoizer is not None:
+            runtime.memoizer = memoizer
+            memoizer.attach(runtime.interpreter)
+
+        result = runtime.run(source)
+        self.assertEqual(result.status, 0, result.errors)
+        self.result = result
+        return runtime
+
+    def memo(self, runtime: LoxRuntime, name: str) -> FunctionMemo:
+        memos = [memo for memo in runtime.memoizer.memos.values() if memo.name == name]
+        self.assertEqual(len(memos), 1, name)
+        return memos[0]
+
+    def test_pure_function_is_cached(self):
+        runtime = self.run_lox("fun sq(n) { return n * n; } for (var i = 0; i < 10; i = i + 1) sq(3); print sq(3);")
+        memo = self.memo(runtime, "sq")
+        self.assertTrue(memo.enabled)
+        self.assertEqual((memo.hits, memo.misses), (10, 1))
+        self.assertEqual(self.result.output, "9\n")
+
+    def test_impure_functions_are_not_cached(self):
+        runtime = self.run_lox("""
+            var count = 0;
+            fun prints(n) { print n; return n; }
+            fun assigns(n) { count = count + 1; return n; }
+            fun callsPrints(n) { return prints(n) + 1; }
+            fun readsClock(n) { return n + clock() * 0; }
+            fun readsArray(n) { return n + len(numbers); }
+            var numbers = array(2);
+            for (var i = 0; i < 3; i = i + 1) {
+                prints(1); assigns(1); callsPrints(1); readsClock(1); readsArray(1);
+            }
+            print count;
+        """)
+        for name in ("prints", "assigns", "callsPrints", "readsClock", "readsArray"):
+            with self.subTest(name=name):
+                memo = self.memo(runtime, name)
+                self.assertFalse(memo.enabled)
+                self.assertEqual((memo.hits, memo.misses), (0, 0))
+        # Every call ran: prints printed 3 times directly and 3 times through callsPrints.
+        self.assertEqual(self.result.output, "1\n" * 6 + "3\n")
+
+    def test_least_recently_used_result_is_evicted(self):
+        runtime = self.run_lox("fun f(n) { return n + 1; } f(1); f(2); f(1); f(3); f(2); f(3);", Memoizer(size=2))
+        memo = self.memo(runtime, "f")
+        # f(3) evicts f(2), which f(1) had made the oldest; f(2) then evicts f(1).
+        self.assertEqual((memo.hits, memo.misses), (2, 4))
+        self.assertEqual(len(memo.results), 2)
+
+    def test_trial_disables_a_memo_that_rarely_hits(self):
+        runtime = self.run_lox(f"fun f(n) {{ return n + 1; }} for (var i = 0; i < {FunctionMemo.TRIAL}; i = i + 1) f(i);")
+        memo = self.memo(runtime, "f")
+        self.assertFalse(memo.enabled)
+        self.assertEqual(memo.misses, FunctionMemo.TRIAL)
+        self.assertEqual(len(memo.results), 0)
+
+    def test_rebound_global_function(self):
+        self.run_lox("""
+            fun step(n) { return n + 1; }
+            fun twice(n) { return step(step(n)); }
+            print twice(1);
+            fun step(n) { return n * 10; }
+            print twice(1);
+        """)
+        self.assertEqual(self.result.output, "3\n100\n")
+
+    def test_reassigned_global_value(self):
+        runtime = LoxRuntime()
+        runtime.run("var k = 1; fun plusK(n) { return n + k; }")
+        self.assertEqual(runtime.run("print plusK(1);").output, "2\n")
+        self.assertEqual(runtime.run("k = 5; print plusK(1);").output, "6\n")
+        # Rebinding a function from another run drops the results of functions calling it too.
+        runtime.run("fun plusK(n) { return n - k; }")
+        self.assertEqual(runtime.run("print plusK(1);").output, "-4\n")
+
+    def test_opt_out(self):
+        runtime = LoxRuntime(memoize=False)
+        self.assertIsNone(runtime.memoizer)
+        self.assertIsNone(runtime.interpreter.memoizer)
+        self.assertEqual(runtime.run("fun sq(n) { return n * n; } print sq(3) + sq(3);").output, "18\n")
+
+    def test_only_the_tree_engine_memoizes(self):
+        for engine in LoxRuntime.ENGINES[1:]:
+            with self.subTest(engine=engine):
+                self.assertIsNone(LoxRuntime(engine).memoizer)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Runs the Lox programs in this directory with the lox command on every
+engine, with and without the optimizer, and checks what they print and
+report against comments:
+
+    print 1 + 2;           // expect: 3
+    printf(1, 2);          // expect runtime error: Expected 1 args but got 2.
+    return 1;              // expect error: Can't return from top-level code.
+
+Errors are expected on the line of their comment. Programs without any
+expectation, like valid.lox, are only samples and are skipped.
+
+    python -m pytest test    # or: python -m unittest discover test
+"""
+import glob
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+TEST = os.path.dirname(os.path.abspath(__file__))
+LOX = os.path.join(TEST, "..", "lox")
+
+ENGINES = ("tree", "stack", "vm", "closure", "python")
+
+EXPECT = re.compile(r"// expect(?: (runtime error|error))?: (.*)$")
+
+
+class Expected:
+    def __init__(self, source: str):
+        self.output = []
+        # Prefix and end of each error message, in order.
+        self.errors = []
+        self.status = 0
+
+        for line, text in enumerate(source.splitlines(), 1):
+            match = EXPECT.search(text)
+            if match is None:
+                continue
+
+            kind, message = match.groups()
+            if kind is None:
+                self.output.append(message + "\n")
+            elif kind == "runtime error":
+                self.errors.append((f"[line {line}] ", message))
+                self.status = 70
+            else:
+                self.errors.append((f"[{line}] Error", message))
+                self.status = 65
+
+    def __bool__(self):
+        return bool(self.output or self.errors)
+
+
+def programs():
+    for path in sorted(glob.glob(os.path.join(TEST, "*.lox"))):
+        with open(path) as f:
+            expected = Expected(f.read())
+        if expected:
+            yield path, expected
+
+
+def lox(path: str, engine: str, optimize: bool):
+    options = ["--no-cache", "--engine", engine] + ([] if optimize else ["--no-optimize"])
+    return subprocess.run([sys.executable, LOX, *options, path], capture_output=True, text=True)
+
+
+class ProgramsTest(unittest.TestCase):
+    def test_programs(self):
+        for path, expected in programs():
+            for engine in ENGINES:
+                for optimize in (True, False):
+                    with self.subTest(program=os.path.basename(path), engine=engine, optimize=optimize):
+                        result = lox(path, engine, optimize)
+                        errors = result.stderr.splitlines()
+                        self.assertEqual(result.stdout, "".join(expected.output))
+                        self.assertEqual(result.returncode, expected.status, result.stderr)
+                        self.assertEqual(len(errors), len(expected.errors), result.stderr)
+                        for error, (prefix, message) in zip(errors, expected.errors):
+                            self.assertTrue(error.startswith(prefix) and error.endswith(message), error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Tests for the resolver's diagnostics and the slots it assigns.
+
+    python -m pytest test    # or: python -m unittest discover test
+"""
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from errors import Diagnostics
+from lox_runtime import LoxRuntime
+from parser import Parser
+from resolver import Resolver
+from scanner import FastScanner
+from stmt import Block, Function, Print, Var
+
+RETURN_AT_TOP_LEVEL = "Error  at 'return': Can't return from top-level code."
+
+
+def resolve(source: str):
+    """Parses and resolves source, returning its statements and the resolver's messages."""
+    errors = Diagnostics(stream=io.StringIO())
+    statements = Parser(FastScanner(source, errors).scan_tokens(), errors).parse()
+    assert not errors.had_error, errors.messages
+    Resolver(errors).resolve(statements)
+    return statements, errors.messages
+
+
+class ResolverTest(unittest.TestCase):
+    def test_return_outside_a_function(self):
+        for source in ("return;", "{ return 1; }", "if (true) return;", "while (false) { { return; } }",
+                       "for (;;) return;"):
+            with self.subTest(source=source):
+                self.assertEqual(resolve(source)[1], [f"[1] {RETURN_AT_TOP_LEVEL}"])
+
+    def test_return_after_a_function(self):
+        # The resolver is outside a function again once a declaration ends, however deeply it was nested.
+        self.assertEqual(resolve("fun f() { fun g() { return; } return; }\nreturn;")[1], [f"[2] {RETURN_AT_TOP_LEVEL}"])
+        self.assertEqual(resolve("{ fun f() { return; } }\n{ return; }")[1], [f"[2] {RETURN_AT_TOP_LEVEL}"])
+
+    def test_return_inside_a_function(self):
+        for source in ("fun f() { return; }", "fun f() { { while (true) return 1; } }", "{ fun f() { return; } }",
+                       "fun f() { fun g() {} return; }"):
+            with self.subTest(source=source):
+                self.assertEqual(resolve(source)[1], [])
+
+    def test_every_error_is_reported(self):
+        self.assertEqual(resolve("return;\nfun f() {}\nreturn;\n{ return; }")[1],
+                         [f"[1] {RETURN_AT_TOP_LEVEL}", f"[3] {RETURN_AT_TOP_LEVEL}", f"[4] {RETURN_AT_TOP_LEVEL}"])
+
+    def test_redeclaration_in_one_scope(self):
+        # Not an error here: the second declaration takes over the slot of the first.
+        (function,), messages = resolve("fun f() { var a = 1; var a = a + 1; print a; }")
+        first, second, output = function.body
+        self.assertEqual(messages, [])
+        self.assertEqual(first.slot, second.slot)
+        self.assertEqual((output.expression.depth, output.expression.slot), (0, first.slot))
+        self.assertEqual(LoxRuntime().run("fun f() { var a = 1; var a = a + 1; print a; } f();").output, "2\n")
+
+    def test_local_in_its_own_initializer(self):
+        # Not an error here either: the initializer sees the variable the declaration shadows.
+        (block,), messages = resolve("{ var a = a; }")
+        self.assertEqual(messages, [])
+        self.assertIsNone(block.statements[0].initializer.depth)
+
+        (function,), messages = resolve("fun f(a) { { var a = a; } }")
+        self.assertEqual(messages, [])
+        (inner,) = function.body[0].statements
+        self.assertEqual((inner.initializer.depth, inner.initializer.slot), (0, 0))
+        self.assertEqual(inner.slot, 1)
+
+        self.assertEqual(LoxRuntime().run("var a = 1; { var a = a + 1; print a; } print a;").output, "2\n1\n")
+
+    def test_slots(self):
+        (function,), messages = resolve("fun f(a, b) { var c; { var d; } { var e; { var g; } } print g; }")
+        c, first, second, output = function.body
+        self.assertEqual(messages, [])
+        self.assertEqual(c.slot, 2)
+        # Sibling blocks take the same slots, and the frame is as large as the most in use at once.
+        self.assertEqual(first.statements[0].slot, 3)
+        self.assertEqual(second.statements[0].slot, 3)
+        self.assertEqual(second.statements[1].statements[0].slot, 4)
+        self.assertEqual(function.size, 5)
+        self.assertEqual((first.size, second.size), (None, None))
+        # g is out of scope after its block, so it is a global.
+        self.assertIsInstance(output, Print)
+        self.assertIsNone(output.expression.depth)
+
+    def test_top_level_block(self):
+        (block, empty), messages = resolve("{ var a; { var b; } var c; } { print 1; }")
+        self.assertEqual(messages, [])
+        self.assertIsInstance(block, Block)
+        a, inner, c = block.statements
+        self.assertIsInstance(c, Var)
+        self.assertEqual((a.slot, inner.statements[0].slot, c.slot), (0, 1, 1))
+        self.assertEqual(block.size, 2)
+        self.assertIsNone(inner.size)
+        # Declares nothing, so it gets no environment.
+        self.assertIsNone(empty.size)
+
+    def test_globals(self):
+        statements, messages = resolve("var a = 1; fun f() { return a; } print a;")
+        declaration, function, output = statements
+        self.assertEqual(messages, [])
+        self.assertIsNone(declaration.slot)
+        self.assertIsInstance(function, Function)
+        self.assertIsNone(function.slot)
+        self.assertIsNone(function.body[0].value.depth)
+        self.assertIsNone(output.expression.depth)
+
+
+if __name__ == "__main__":
+    unittest.main()
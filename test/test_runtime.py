@@ -0,0 +1,128 @@
+"""
+Tests for LoxRuntime, run on every engine, and AsyncLoxRuntime.
+
+    python -m pytest test    # or: python -m unittest discover test
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lox_runtime import LoxRuntime, AsyncLoxRuntime
+
+
+class LoxRuntimeTest(unittest.TestCase):
+    def test_globals_assigned_by_an_earlier_run(self):
+        # The optimizer sees one run at a time, so it must not take x for a constant.
+        for engine in LoxRuntime.ENGINES:
+            for optimize in (True, False):
+                with self.subTest(engine=engine, optimize=optimize):
+                    runtime = LoxRuntime(engine, optimize)
+                    self.assertEqual(runtime.run("fun setx() { x = 9; }").status, 0)
+                    result = runtime.run("var x = 1; setx(); print x;")
+                    self.assertEqual((result.status, result.output), (0, "9\n"))
+
+    def test_missing_expression(self):
+        for engine in LoxRuntime.ENGINES:
+            for source in ("print ;", "1 +;", "x = ;", "print (;"):
+                with self.subTest(engine=engine, source=source):
+                    result = LoxRuntime(engine).run(source)
+                    self.assertEqual(result.status, 65)
+                    self.assertEqual(len(result.errors), 1)
+                    self.assertIn("Expect expression.", result.errors[0])
+
+    def test_for_without_increment(self):
+        for engine in LoxRuntime.ENGINES:
+            with self.subTest(engine=engine):
+                result = LoxRuntime(engine).run("for (var i = 0; i < 2;) { print i; i = i + 1; }")
+                self.assertEqual((result.status, result.output), (0, "0\n1\n"))
+
+    def test_negative_zero_constant(self):
+        # Folded to literals 0 and -0, which are equal but must not share a VM constant.
+        for engine in LoxRuntime.ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(LoxRuntime(engine).run("print 0; print -0;").output, "0\n-0\n")
+
+    def test_global_redefined_by_a_later_run(self):
+        # The call site in run() caches step() while the globals stay unchanged, see global_caches.lox.
+        for engine in LoxRuntime.ENGINES:
+            with self.subTest(engine=engine):
+                runtime = LoxRuntime(engine)
+                runtime.run("var k = 1; fun step(n) { return n + k; } fun run(n) { return step(n); }")
+                self.assertEqual(runtime.run("print run(1); print run(1);").output, "2\n2\n")
+                runtime.run("k = 5;")
+                self.assertEqual(runtime.run("print run(1);").output, "6\n")
+                runtime.run("fun step(n) { return n * 100; }")
+                self.assertEqual(runtime.run("print run(1);").output, "100\n")
+
+    def test_pooled_frames(self):
+        # A frame for each level of the deepest recursion, each pooled once and without the values of its call.
+        for engine in ("tree", "stack", "closure"):
+            with self.subTest(engine=engine):
+                runtime = LoxRuntime(engine, memoize=False)
+                result = runtime.run("fun down(n) { var big = array(1000); if (n > 0) down(n - 1); return n; } down(20);")
+                self.assertEqual(result.status, 0, result.errors)
+
+                free = runtime.interpreter.free_environments
+                self.assertEqual(len(free), 21)
+                self.assertEqual(len({id(environment) for environment in free}), len(free))
+                self.assertTrue(all(environment.values is None for environment in free))
+
+
+class AsyncLoxRuntimeTest(unittest.IsolatedAsyncioTestCase):
+    async def test_completes(self):
+        runtime = AsyncLoxRuntime(steps_per_yield=10)
+        result = await runtime.run("var total = 0; for (var i = 0; i < 100; i = i + 1) total = total + i; print total;")
+        self.assertEqual((result.status, result.output, result.errors), (0, "4950\n", []))
+
+        # Globals persist into the next run.
+        result = await runtime.run("print total + 1;")
+        self.assertEqual((result.status, result.output), (0, "4951\n"))
+
+    async def test_max_steps(self):
+        runtime = AsyncLoxRuntime(max_steps=50, steps_per_yield=7)
+        result = await runtime.run("print \"start\";\nwhile (true) {}")
+        self.assertEqual((result.status, result.output), (70, "start\n"))
+        self.assertEqual(result.errors, ["[line 2] Script exceeded its limit of 50 steps."])
+
+        # The runtime is usable again after a stop.
+        result = await runtime.run("print 1;")
+        self.assertEqual((result.status, result.output, result.errors), (0, "1\n", []))
+
+    async def test_timeout(self):
+        runtime = AsyncLoxRuntime(timeout=0.05)
+        result = await runtime.run("while (true) {}")
+        self.assertEqual(result.status, 70)
+        self.assertEqual(result.errors, ["[line 1] Script exceeded its time limit of 0.05 seconds."])
+
+    async def test_yields_to_other_tasks(self):
+        runtime = AsyncLoxRuntime(max_steps=10000, steps_per_yield=10)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.create_task(tick())
+        await runtime.run("while (true) {}")
+        ticker.cancel()
+        self.assertGreater(ticks, 100)
+
+    async def test_cancel_and_run_again(self):
+        runtime = AsyncLoxRuntime(steps_per_yield=10)
+        task = asyncio.create_task(runtime.run("var x = 5; fun spin() { while (true) {} } spin();"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        result = await runtime.run("print x;")
+        self.assertEqual((result.status, result.output, result.errors), (0, "5\n", []))
+
+
+if __name__ == "__main__":
+    unittest.main()
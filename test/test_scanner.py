@@ -0,0 +1,97 @@
+"""
+Tests for the scanners.
+
+    python -m pytest test    # or: python -m unittest discover test
+"""
+import glob
+import io
+import os
+import sys
+import unittest
+
+TEST = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(TEST, "..")
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from errors import Diagnostics
+from scanner import Scanner, FastScanner, StreamingScanner
+from scanner_bench import synthetic_source
+
+# Lexemes FastScanner's pattern does not take in one match, or takes in a way that is easy to get wrong.
+SNIPPETS = {
+    "operators": "!===<=>=!<>=/=/ /",
+    "numbers": "1 1.5 1. 1.5.2 .5 007 123abc 1.x 2.e",
+    "identifiers": "_ _a a_1 var1 orchid or and_ classy",
+    "non ascii": "héllo = \"wörld\"; π ٣٤ x٣ 1é",
+    "strings": "\"\" \"a\nb\" \"// not a comment\" \"/* nor this */\"",
+    "unterminated string": "print 1;\n\"abc\ndef",
+    "line comment at end": "a // comment",
+    "block comments": "a /* one */ b /* two\nlines */ c /**/ d /***/ e",
+    "nested block comments": "a /* outer /* inner */ still outer */ b",
+    "unterminated block comment": "a /* never\nclosed",
+    "unterminated nested block comment": "a /* outer /* inner */ b",
+    "stray characters": "a @ b # $ c ` ~",
+    "whitespace": " \t\r\n\n  a\r\n\tb \n",
+    "empty": "",
+}
+
+
+def scan(scanner_class, source: str):
+    errors = Diagnostics(stream=io.StringIO())
+    tokens = scanner_class(source, errors).scan_tokens()
+    return tokens, errors.messages
+
+
+def sources():
+    """Name and source of every program to scan: the snippets, the Lox files in the repository and a generated one."""
+    yield from SNIPPETS.items()
+    for path in sorted(glob.glob(os.path.join(TEST, "*.lox")) + glob.glob(os.path.join(ROOT, "bench", "corpus", "*.lox"))):
+        with open(path) as f:
+            yield os.path.relpath(path, ROOT), f.read()
+    yield "synthetic", synthetic_source(200)
+
+
+class FastScannerTest(unittest.TestCase):
+    def test_same_tokens_as_scanner(self):
+        for name, source in sources():
+            with self.subTest(name):
+                expected_tokens, expected_errors = scan(Scanner, source)
+                tokens, errors = scan(FastScanner, source)
+                self.assertEqual(tokens, expected_tokens)
+                self.assertEqual(errors, expected_errors)
+
+    def test_errors_of_snippets(self):
+        # Keeps the comparison above from passing on two scanners that both lost an error.
+        self.assertEqual(scan(FastScanner, SNIPPETS["unterminated string"])[1], ["[3] Error : Unterminated string."])
+        self.assertEqual(scan(FastScanner, SNIPPETS["unterminated block comment"])[1],
+                         ["[2] Error : Unterminated multi-line comment."])
+        self.assertEqual(len(scan(FastScanner, SNIPPETS["stray characters"])[1]), 5)
+
+
+class StreamingScannerTest(unittest.TestCase):
+    # Chunks this small split lexemes, comments and strings across reads everywhere in a program.
+    CHUNK_SIZES = (1, 2, 3, 7)
+
+    def test_same_tokens_as_fast_scanner(self):
+        for name, source in sources():
+            expected = scan(FastScanner, source)
+            for chunk_size in self.CHUNK_SIZES:
+                with self.subTest(name, chunk_size=chunk_size):
+                    errors = Diagnostics(stream=io.StringIO())
+                    tokens = list(StreamingScanner(io.StringIO(source), chunk_size, errors).scan_stream())
+                    self.assertEqual((tokens, errors.messages), expected)
+
+    def test_keeps_only_the_unscanned_tail(self):
+        source = synthetic_source(200)
+        scanner = StreamingScanner(io.StringIO(source), 7)
+        longest = 0
+        for _ in scanner.scan_stream():
+            longest = max(longest, len(scanner.source))
+        # The longest lexeme of the program, a comment line, plus a chunk.
+        self.assertLess(longest, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,396 @@
+from expr import *
+from stmt import *
+from lox_token import Token, TokenType
+from lox_callable import LoxCallable
+from errors import LoxRuntimeError
+from typing import Dict, List
+import math
+
+
+class TailCall:
+    """Returned by generated code in place of a call in tail position, for the caller to make."""
+    __slots__ = ("function", "arguments")
+
+    def __init__(self, function, arguments: List):
+        self.function = function
+        self.arguments = arguments
+
+
+class PythonFunction(LoxCallable):
+    def __init__(self, function, name: str, arity: int):
+        self.function = function
+        self.name = name
+        self.arity_ = arity
+
+    def call(self, interpreter, arguments: List):
+        result = self.function(*arguments)
+        while type(result) is TailCall:
+            result = result.function(*result.arguments)
+        return result
+
+    def arity(self): return self.arity_
+
+    def __str__(self): return f"<fun {self.name}>"
+
+
+class PythonRuntime:
+    """Helpers the generated code falls back on for everything but the fast paths."""
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.globals = interpreter.globals.values
+
+    def namespace(self, tokens: List[Token], constants: List) -> Dict:
+        return {
+            "G": self.globals,
+            "T": tokens,
+            "K": constants,
+            "_float": float,
+            "_function": PythonFunction,
+            "_print": self.print,
+            "_undefined": self.undefined,
+            "_assign_global": self.assign_global,
+            "_add": self.add,
+            "_number_error": self.number_error,
+            "_divide": self.divide,
+            "_negate": self.negate,
+            "_callee": self.callee,
+            "_call": self.call,
+            "_tail_call": self.tail_call,
+        }
+
+    def print(self, value):
+        self.interpreter.output.write(self.interpreter.stringify(value) + "\n")
+
+    def undefined(self, name: Token):
+        raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+
+    def assign_global(self, name: Token, value):
+        if name.lexeme not in self.globals:
+            self.undefined(name)
+        self.globals[name.lexeme] = value
+        return value
+
+    def add(self, left, right, operator: Token):
+        if (isinstance(left, float) and isinstance(right, float)) \
+            or (isinstance(left, str) and isinstance(right, str)):
+            return left + right
+        elif isinstance(left, str) or isinstance(right, str):
+            return str(left) + str(right)
+        raise LoxRuntimeError(operator,
+            f"Not supported between operands of type {type(left)} and {type(right)}.")
+
+    def number_error(self, operator: Token):
+        raise LoxRuntimeError(operator, "Operands must be numbers")
+
+    def divide(self, left, right, operator: Token):
+        self.interpreter.check_number_operands(operator, left, right)
+        raise LoxRuntimeError(operator, "Division by Zero")
+
+    def negate(self, operator: Token):
+        raise LoxRuntimeError(operator, "Operand must be a number")
+
+    def callee(self, callee, paren: Token):
+        if not isinstance(callee, LoxCallable):
+            raise LoxRuntimeError(paren, "Can only call functions and classes")
+        return callee
+
+    def call(self, callee: LoxCallable, arguments: List, paren: Token):
+        if len(arguments) != callee.arity():
+            raise LoxRuntimeError(paren, f"Expected {callee.arity()} args but got {len(arguments)}.")
+
+        if type(callee) is PythonFunction:
+            # Tail calls come back as TailCall instead of nesting, so tail recursion runs in constant Python stack.
+            result = callee.function(*arguments)
+            while type(result) is TailCall:
+                result = result.function(*result.arguments)
+            return result
+        return self.interpreter.call_native(callee, arguments, paren)
+
+    def tail_call(self, callee: LoxCallable, arguments: List, paren: Token):
+        if len(arguments) != callee.arity():
+            raise LoxRuntimeError(paren, f"Expected {callee.arity()} args but got {len(arguments)}.")
+
+        if type(callee) is PythonFunction:
+            return TailCall(callee.function, arguments)
+        return self.interpreter.call_native(callee, arguments, paren)
+
+
+class Transpiler(StmtVisitor, ExprVisitor):
+    """
+    Lowers a program into Python source so CPython's own bytecode runs it.
+
+    Lox locals become Python locals with a unique name per declaration, globals
+    live in the `G` dictionary and tokens needed for error reporting are
+    referenced through `T`. Arithmetic is inlined with a type guard and only
+    calls into PythonRuntime when the guard fails.
+    """
+    ARITHMETIC = {
+        TokenType.MINUS: "-",
+        TokenType.STAR: "*",
+        TokenType.LESS: "<",
+        TokenType.LESS_EQUAL: "<=",
+        TokenType.GREATER: ">",
+        TokenType.GREATER_EQUAL: ">=",
+    }
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.indent = 0
+        self.tokens: List[Token] = []
+        self.constants: List = []
+        self.scopes: List[Dict[str, str]] = []
+        self.names = 0
+
+    def transpile(self, statements: List[Stmt]) -> str:
+        self.emit("def __main__():")
+        self.indent += 1
+        self.body(statements)
+        self.indent -= 1
+        return "\n".join(self.lines) + "\n"
+
+    def body(self, statements: List[Stmt]):
+        start = len(self.lines)
+        for statement in statements:
+            self.statement(statement)
+        if len(self.lines) == start:
+            self.emit("pass")
+
+    def statement(self, stmt: Stmt):
+        stmt.accept(self)
+
+    def visit_expression_stmt(self, stmt: Expression):
+        expr = stmt.expression
+
+        if isinstance(expr, Assign) and self.lookup(expr.name) is not None:
+            self.emit(f"{self.lookup(expr.name)} = {self.expression(expr.value)}")
+            return
+
+        if isinstance(expr, Assign):
+            value = self.temporary()
+            self.emit(f"{value} = {self.expression(expr.value)}")
+            self.emit(f"if {expr.name.lexeme!r} not in G: _undefined({self.token(expr.name)})")
+            self.emit(f"G[{expr.name.lexeme!r}] = {value}")
+            return
+
+        self.emit(self.expression(expr))
+
+    def visit_function_stmt(self, stmt: Function):
+        enclosing = self.scopes
+        self.scopes = [dict()]
+
+        parameters = []
+        for parameter in stmt.parameters:
+            parameters.append(self.new_name(parameter.lexeme))
+            self.scopes[-1][parameter.lexeme] = parameters[-1]
+
+        function = self.new_name("_f")
+        self.emit(f"def {function}({', '.join(parameters)}):")
+        self.indent += 1
+        self.body(stmt.body)
+        self.indent -= 1
+
+        self.scopes = enclosing
+        self.define(stmt.name, f"_function({function}, {stmt.name.lexeme!r}, {len(parameters)})")
+
+    def visit_if_stmt(self, stmt: If):
+        self.emit(f"if {self.expression(stmt.condition)}:")
+        self.nested(stmt.then_branch)
+
+        if stmt.else_branch is not None:
+            self.emit("else:")
+            self.nested(stmt.else_branch)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.emit(f"_print({self.expression(stmt.expression)})")
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes.append(dict())
+        self.body(stmt.statements)
+        self.scopes.pop()
+
+    def visit_declaration_stmt(self, stmt: Var):
+        value = "None"
+        if stmt.initializer is not None:
+            value = self.expression(stmt.initializer)
+
+        self.define(stmt.name, value)
+
+    def visit_while_stmt(self, stmt: While):
+        self.emit(f"while {self.expression(stmt.condition)}:")
+        self.nested(stmt.body)
+
+    def visit_return_stmt(self, stmt: Return):
+        if isinstance(stmt.value, Call):
+            self.emit(f"return {self.call(stmt.value, '_tail_call')}")
+        elif stmt.value is None:
+            self.emit("return None")
+        else:
+            self.emit(f"return {self.expression(stmt.value)}")
+
+    def visit_conditional_expr(self, expr: Conditional):
+        condition = self.expression(expr.condition)
+        then_branch = self.expression(expr.then_branch)
+        else_branch = self.expression(expr.else_branch)
+        return f"({then_branch} if {condition} else {else_branch})", False
+
+    def visit_binary_expr(self, expr: Binary):
+        left, left_number = expr.left.accept(self)
+        right, right_number = expr.right.accept(self)
+        operator = expr.operator
+
+        if operator.type == TokenType.COMMA:
+            return f"({left}, {right})[1]", right_number
+
+        if operator.type == TokenType.EQUAL_EQUAL:
+            return f"({left} == {right})", False
+
+        if operator.type == TokenType.BANG_EQUAL:
+            return f"({left} != {right})", False
+
+        is_number = operator.type in (TokenType.MINUS, TokenType.STAR, TokenType.SLASH, TokenType.PLUS)
+        if left_number and right_number and operator.type != TokenType.SLASH:
+            symbol = "+" if operator.type == TokenType.PLUS else self.ARITHMETIC[operator.type]
+            return f"({left} {symbol} {right})", is_number
+
+        a, b = self.temporary(), self.temporary()
+        guard = f"(type({a} := {left}) is _float) & (type({b} := {right}) is _float)"
+        token = self.token(operator)
+
+        match(operator.type):
+            case TokenType.PLUS:
+                return f"({a} + {b} if {guard} else _add({a}, {b}, {token}))", False
+            case TokenType.SLASH:
+                return f"({a} / {b} if {guard} and {b} != 0 else _divide({a}, {b}, {token}))", True
+            case op if op in self.ARITHMETIC:
+                return f"({a} {self.ARITHMETIC[op]} {b} if {guard} else _number_error({token}))", is_number
+            case _:
+                raise NotImplementedError(f"Operator type <{operator.type}> not implemented.")
+
+    def visit_call_expr(self, expr: Call):
+        return self.call(expr, "_call"), False
+
+    def call(self, expr: Call, helper: str) -> str:
+        token = self.token(expr.paren)
+        callee = self.expression(expr.callee)
+        arguments = ", ".join(self.expression(argument) for argument in expr.arguments)
+        return f"{helper}(_callee({callee}, {token}), [{arguments}], {token})"
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        value = expr.value
+        if isinstance(value, float) and not math.isfinite(value):
+            self.constants.append(value)
+            return f"K[{len(self.constants) - 1}]", True
+        return repr(value), isinstance(value, float)
+
+    def visit_logical_expr(self, expr: Logical):
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+
+        if expr.operator.type == TokenType.OR:
+            return f"(True if {left} else {right})", False
+        return f"({right} if {left} else False)", False
+
+    def visit_unary_expr(self, expr: Unary):
+        right, is_number = expr.right.accept(self)
+
+        match(expr.operator.type):
+            case TokenType.BANG:
+                return f"(not {right})", False
+
+            case TokenType.MINUS:
+                if is_number:
+                    return f"(-{right})", True
+
+                value = self.temporary()
+                return f"(-{value} if type({value} := {right}) is _float else _negate({self.token(expr.operator)}))", True
+
+            case _:
+                raise NotImplementedError(f"Operator <{expr.operator.type}> not implemented.")
+
+    def visit_variable_expr(self, expr: Variable):
+        local = self.lookup(expr.name)
+        if local is not None:
+            return local, False
+
+        name = repr(expr.name.lexeme)
+        return f"(G[{name}] if {name} in G else _undefined({self.token(expr.name)}))", False
+
+    def visit_assign_expr(self, expr: Assign):
+        value = self.expression(expr.value)
+        local = self.lookup(expr.name)
+
+        if local is not None:
+            return f"({local} := {value})", False
+        return f"_assign_global({self.token(expr.name)}, {value})", False
+
+    def expression(self, expr: Expr) -> str:
+        return expr.accept(self)[0]
+
+    def nested(self, stmt: Stmt):
+        self.indent += 1
+        self.body([stmt])
+        self.indent -= 1
+
+    def define(self, name: Token, value: str):
+        if not self.scopes:
+            self.emit(f"G[{name.lexeme!r}] = {value}")
+            return
+
+        local = self.scopes[-1].get(name.lexeme)
+        if local is None:
+            local = self.new_name(name.lexeme)
+
+        self.emit(f"{local} = {value}")
+        self.scopes[-1][name.lexeme] = local
+
+    def lookup(self, name: Token):
+        for scope in reversed(self.scopes):
+            if name.lexeme in scope:
+                return scope[name.lexeme]
+        return None
+
+    def new_name(self, name: str) -> str:
+        # The numeric suffix keeps Lox names clear of Python keywords and helpers.
+        self.names += 1
+        if not name.isidentifier():
+            name = "v"
+        return f"{name}_{self.names}"
+
+    def temporary(self) -> str:
+        self.names += 1
+        return f"_t{self.names}"
+
+    def token(self, token: Token) -> str:
+        self.tokens.append(token)
+        return f"T[{len(self.tokens) - 1}]"
+
+    def emit(self, line: str):
+        self.lines.append("    " * self.indent + line)
+
+
+class PythonEngine:
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.runtime = PythonRuntime(interpreter)
+
+    def interpret(self, statements: List[Stmt]):
+        transpiler = Transpiler()
+        source = transpiler.transpile(statements)
+
+        try:
+            code = compile(source, "<lox>", "exec")
+        except (SyntaxError, RecursionError, MemoryError):
+            # Nesting deeper than CPython's compiler accepts; run the tree walker instead.
+            self.interpreter.interpret(statements)
+            return
+
+        namespace = self.runtime.namespace(transpiler.tokens, transpiler.constants)
+        exec(code, namespace)
+
+        try:
+            namespace["__main__"]()
+        except LoxRuntimeError as e:
+            self.interpreter.errors.runtime_error(e)
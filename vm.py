@@ -0,0 +1,321 @@
+from compiler import Chunk, FunctionProto, OpCode
+from lox_callable import LoxCallable
+from native_functions import NATIVES
+from interpreter import Interpreter
+from errors import Error, LoxRuntimeError
+from output import Output, STDOUT
+from typing import Dict, List
+
+
+class VMFunction(LoxCallable):
+    def __init__(self, proto: FunctionProto):
+        self.proto = proto
+
+    def call(self, vm, arguments: List):
+        return vm.run(self.proto, arguments)
+
+    def arity(self): return self.proto.arity
+
+    def __str__(self): return f"<fun {self.proto.name}>"
+
+
+class VM:
+    """Stack based virtual machine executing the bytecode produced by the Compiler."""
+    stringify = Interpreter.stringify
+    call_native = Interpreter.call_native
+
+    def __init__(self, globals: Dict[str, object] = None, errors=Error, output: Output = STDOUT):
+        self.globals = {} if globals is None else globals
+        self.errors = errors
+        self.output = output
+        for name, native in NATIVES.items():
+            self.globals.setdefault(name, native())
+
+    def interpret(self, script: FunctionProto):
+        try:
+            self.run(script, [])
+        except LoxRuntimeError as e:
+            self.errors.runtime_error(e)
+
+    def run(self, function: FunctionProto, arguments: List):
+        CONSTANT = OpCode.CONSTANT
+        NIL = OpCode.NIL
+        TRUE = OpCode.TRUE
+        FALSE = OpCode.FALSE
+        POP = OpCode.POP
+        GET_LOCAL = OpCode.GET_LOCAL
+        SET_LOCAL = OpCode.SET_LOCAL
+        STORE_LOCAL = OpCode.STORE_LOCAL
+        GET_GLOBAL = OpCode.GET_GLOBAL
+        SET_GLOBAL = OpCode.SET_GLOBAL
+        DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL
+        ADD = OpCode.ADD
+        SUBTRACT = OpCode.SUBTRACT
+        MULTIPLY = OpCode.MULTIPLY
+        DIVIDE = OpCode.DIVIDE
+        EQUAL = OpCode.EQUAL
+        NOT_EQUAL = OpCode.NOT_EQUAL
+        LESS = OpCode.LESS
+        LESS_EQUAL = OpCode.LESS_EQUAL
+        GREATER = OpCode.GREATER
+        GREATER_EQUAL = OpCode.GREATER_EQUAL
+        NOT = OpCode.NOT
+        NEGATE = OpCode.NEGATE
+        PRINT = OpCode.PRINT
+        JUMP = OpCode.JUMP
+        POP_JUMP_IF_FALSE = OpCode.POP_JUMP_IF_FALSE
+        CALL = OpCode.CALL
+        FUNCTION = OpCode.FUNCTION
+        RETURN = OpCode.RETURN
+        STORE_GLOBAL = OpCode.STORE_GLOBAL
+        JUMP_IF_NOT_LESS = OpCode.JUMP_IF_NOT_LESS
+        JUMP_IF_NOT_LESS_EQUAL = OpCode.JUMP_IF_NOT_LESS_EQUAL
+        JUMP_IF_NOT_GREATER = OpCode.JUMP_IF_NOT_GREATER
+        JUMP_IF_NOT_GREATER_EQUAL = OpCode.JUMP_IF_NOT_GREATER_EQUAL
+        TAIL_CALL = OpCode.TAIL_CALL
+
+        globals_ = self.globals
+        write = self.output.write
+        stringify = self.stringify
+
+        frames = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        chunk: Chunk = function.chunk
+        code = chunk.code
+        constants = chunk.constants
+        slots = arguments + [None] * (function.locals - len(arguments))
+        ip = 0
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            if op == GET_LOCAL:
+                push(slots[code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                push(constants[code[ip]])
+                ip += 1
+            elif op == JUMP_IF_NOT_LESS:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip], "Operands must be numbers")
+                if left < right:
+                    ip += 1
+                else:
+                    ip = code[ip]
+            elif op == STORE_GLOBAL:
+                name = constants[code[ip]]
+                if name not in globals_:
+                    raise LoxRuntimeError(chunk.tokens[ip], f"Undefined variable '{name}'.")
+                globals_[name] = pop()
+                ip += 1
+            elif op == POP_JUMP_IF_FALSE:
+                if pop():
+                    ip += 1
+                else:
+                    ip = code[ip]
+            elif op == JUMP:
+                ip = code[ip]
+            elif op == GET_GLOBAL:
+                try:
+                    push(globals_[constants[code[ip]]])
+                except KeyError:
+                    raise LoxRuntimeError(chunk.tokens[ip], f"Undefined variable '{constants[code[ip]]}'.")
+                ip += 1
+            elif op == SET_LOCAL:
+                slots[code[ip]] = stack[-1]
+                ip += 1
+            elif op == STORE_LOCAL:
+                slots[code[ip]] = pop()
+                ip += 1
+            elif op == POP:
+                pop()
+            elif op == ADD:
+                right = pop()
+                left = stack[-1]
+                if (type(left) is float and type(right) is float) \
+                    or (type(left) is str and type(right) is str):
+                    stack[-1] = left + right
+                elif isinstance(left, str) or isinstance(right, str):
+                    stack[-1] = str(left) + str(right)
+                else:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1],
+                        f"Not supported between operands of type {type(left)} and {type(right)}.")
+            elif op == LESS:
+                right = pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Operands must be numbers")
+                stack[-1] = left < right
+            elif op == SUBTRACT:
+                right = pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Operands must be numbers")
+                stack[-1] = left - right
+            elif op == SET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                if name not in globals_:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], f"Undefined variable '{name}'.")
+                globals_[name] = stack[-1]
+            elif op == CALL:
+                argc = code[ip]
+                ip += 1
+                callee = stack[-argc - 1]
+
+                if type(callee) is VMFunction and callee.proto.arity == argc:
+                    proto = callee.proto
+                    new_slots = stack[len(stack) - argc:]
+                    new_slots.extend([None] * (proto.locals - argc))
+                    del stack[len(stack) - argc - 1:]
+
+                    frames.append((chunk, ip, slots))
+                    chunk = proto.chunk
+                    code = chunk.code
+                    constants = chunk.constants
+                    slots = new_slots
+                    ip = 0
+                else:
+                    if not isinstance(callee, LoxCallable):
+                        raise LoxRuntimeError(chunk.tokens[ip - 1], "Can only call functions and classes")
+
+                    if argc != callee.arity():
+                        raise LoxRuntimeError(chunk.tokens[ip - 1], f"Expected {callee.arity()} args but got {argc}.")
+
+                    arguments = stack[len(stack) - argc:]
+                    del stack[len(stack) - argc - 1:]
+                    push(self.call_native(callee, arguments, chunk.tokens[ip - 1]))
+            elif op == RETURN:
+                if not frames:
+                    return pop()
+
+                chunk, ip, slots = frames.pop()
+                code = chunk.code
+                constants = chunk.constants
+            elif op == TAIL_CALL:
+                argc = code[ip]
+                ip += 1
+                callee = stack[-argc - 1]
+
+                if type(callee) is VMFunction and callee.proto.arity == argc:
+                    # The callee takes over the current frame, so tail recursion never grows `frames`.
+                    proto = callee.proto
+                    slots = stack[len(stack) - argc:]
+                    slots.extend([None] * (proto.locals - argc))
+                    del stack[len(stack) - argc - 1:]
+
+                    chunk = proto.chunk
+                    code = chunk.code
+                    constants = chunk.constants
+                    ip = 0
+                    continue
+
+                if not isinstance(callee, LoxCallable):
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Can only call functions and classes")
+
+                if argc != callee.arity():
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], f"Expected {callee.arity()} args but got {argc}.")
+
+                arguments = stack[len(stack) - argc:]
+                del stack[len(stack) - argc - 1:]
+                push(self.call_native(callee, arguments, chunk.tokens[ip - 1]))
+
+                if not frames:
+                    return pop()
+
+                chunk, ip, slots = frames.pop()
+                code = chunk.code
+                constants = chunk.constants
+            elif op == MULTIPLY:
+                right = pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Operands must be numbers")
+                stack[-1] = left * right
+            elif op == DIVIDE:
+                right = pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Operands must be numbers")
+                if right == 0:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Division by Zero")
+                stack[-1] = left / right
+            elif op == LESS_EQUAL:
+                right = pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Operands must be numbers")
+                stack[-1] = left <= right
+            elif op == GREATER:
+                right = pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Operands must be numbers")
+                stack[-1] = left > right
+            elif op == GREATER_EQUAL:
+                right = pop()
+                left = stack[-1]
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Operands must be numbers")
+                stack[-1] = left >= right
+            elif op == JUMP_IF_NOT_LESS_EQUAL:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip], "Operands must be numbers")
+                if left <= right:
+                    ip += 1
+                else:
+                    ip = code[ip]
+            elif op == JUMP_IF_NOT_GREATER:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip], "Operands must be numbers")
+                if left > right:
+                    ip += 1
+                else:
+                    ip = code[ip]
+            elif op == JUMP_IF_NOT_GREATER_EQUAL:
+                right = pop()
+                left = pop()
+                if type(left) is not float or type(right) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip], "Operands must be numbers")
+                if left >= right:
+                    ip += 1
+                else:
+                    ip = code[ip]
+            elif op == EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] == right
+            elif op == NOT_EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] != right
+            elif op == PRINT:
+                write(stringify(pop()) + "\n")
+            elif op == NIL:
+                push(None)
+            elif op == TRUE:
+                push(True)
+            elif op == FALSE:
+                push(False)
+            elif op == NOT:
+                stack[-1] = not stack[-1]
+            elif op == NEGATE:
+                if type(stack[-1]) is not float:
+                    raise LoxRuntimeError(chunk.tokens[ip - 1], "Operand must be a number")
+                stack[-1] = -stack[-1]
+            elif op == DEFINE_GLOBAL:
+                globals_[constants[code[ip]]] = pop()
+                ip += 1
+            elif op == FUNCTION:
+                push(VMFunction(constants[code[ip]]))
+                ip += 1
+            else:
+                raise NotImplementedError(f"Opcode <{op}> not implemented.")